@@ -1,9 +1,13 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+import io
 import base64
 from pathlib import Path
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit_autorefresh import st_autorefresh
 
 
@@ -14,6 +18,7 @@ try:
     from drive_cache import (
         get_drive_service,
         get_root_folder_id,
+        list_cached_files,
         load_cached_data,
     )
     DRIVE_AVAILABLE = True
@@ -27,6 +32,7 @@ try:
     from data_fetcher import (
         REGIONS,
         run_region_cached_with_range,
+        usfs_mask,
         get_api_errors,
         clear_api_errors,
     )
@@ -42,14 +48,15 @@ st.set_page_config(page_title="Fuel Monitoring Dashboard", layout="wide")
 # ─────────────────────────────────────────────────────────────────────────────
 # Logo
 # ─────────────────────────────────────────────────────────────────────────────
-def load_image_base64(image_path):
+@st.cache_resource(show_spinner=False)
+def _logo_b64():
+    # Read + encode once per process; the asset never changes between reruns
     try:
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
+        return base64.b64encode(Path("assets/logo.png").read_bytes()).decode()
     except FileNotFoundError:
         return ""
 
-LOGO_BASE64 = load_image_base64("assets/logo.png")
+LOGO_BASE64 = _logo_b64()
 
 
 RATE_CATEGORIES = [
@@ -93,12 +100,34 @@ with header_col2:
 # ─────────────────────────────────────────────────────────────────────────────
 # Date range inputs
 # ─────────────────────────────────────────────────────────────────────────────
-end_time_start = pd.Timestamp.now() - pd.Timedelta(days=2)
-START_DATE = (end_time_start - pd.Timedelta(days=10)).date()
-END_DATE = end_time_start.date()
-
-start_time_ms = int(pd.Timestamp(START_DATE).normalize().timestamp() * 1000)
-end_time_ms   = int((pd.Timestamp(END_DATE).normalize() + pd.Timedelta(days=1)).timestamp() * 1000)
+@st.cache_data(ttl=60 * 60, show_spinner=False)
+def _date_window():
+    # Day-granular window; recomputed at most hourly instead of on every rerun
+    end_time_start = pd.Timestamp.now() - pd.Timedelta(days=2)
+    start_date = (end_time_start - pd.Timedelta(days=10)).date()
+    end_date = end_time_start.date()
+
+    start_ms = int(pd.Timestamp(start_date).normalize().timestamp() * 1000)
+    end_ms   = int((pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)).timestamp() * 1000)
+    return start_date, end_date, start_ms, end_ms
+
+START_DATE, END_DATE, start_time_ms, end_time_ms = _date_window()
+DATE_TAG = f"{START_DATE}_{END_DATE}"
+
+# Export-tab download name → widget-key prefix
+EXPORT_KEYS = {
+    "DPL_Theft":       "download_theft",
+    "DPL_Filling":     "download_fill",
+    "CEV_Theft":       "download_theft_cev",
+    "CEV_Filling":     "download_fill_cev",
+    "PV_Theft":        "download_pv_theft",
+    "PV_Filling":      "download_pv_fill",
+    "USFS_Theft":      "download_usfs_theft",
+    "USFS_Filling":    "download_usfs_fill",
+    "Low_Fuel_Alerts": "download_low_fuel",
+    "Data_Loss":       "download_data_loss",
+    "Combined_Export": "combined_download",
+}
 
 if st.button("🔄 Refresh Data"):
     st.cache_data.clear()
@@ -122,33 +151,121 @@ def _get_drive_handles():
         return None, None
 
 
+def _downcast_numeric(df):
+    # int64 → smallest int that fits; floats stay float64 so totals/CSV values keep full precision
+    cols = {
+        c: pd.to_numeric(df[c], downcast="integer")
+        for c in df.select_dtypes("int64").columns
+    }
+    return df.assign(**cols) if cols else df
+
+
+def _script_executor(max_workers):
+    # Worker threads that call st.cache_* functions need the session's ScriptRunContext,
+    # otherwise Streamlit logs "missing ScriptRunContext" and cache calls lose the session
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    )
+
+
+def region_results(results, region):
+    # {key: df} view of one region from the flat {(region, key): df} results
+    return {key: df for (r, key), df in results.items() if r == region}
+
+
+def _prepare_frames(data):
+    # Shared post-processing for a region's {key: df}, run inside the loaders' caches
+    for key, df in data.items():
+        if not isinstance(df, pd.DataFrame):
+            continue
+        df = _downcast_numeric(df)
+        # Arrow-backed strings: compact columnar storage, vectorised .str ops
+        if "fuel_type" in df.columns:
+            df = df.assign(fuel_type=df["fuel_type"].astype("string[pyarrow]"))
+        # Parse the daily series' "time" once here (behind the cache) instead of in every
+        # chart builder; raw frames keep their original values for the CSV exports
+        if (key.endswith("_daily") and "time" in df.columns
+                and not pd.api.types.is_datetime64_any_dtype(df["time"])):
+            df = df.assign(time=pd.to_datetime(df["time"], errors="coerce"))
+        data[key] = df
+
+    return data
+
+
 # ─────────────────────────────────────────────────────────────────────────────
-# Core loader: Drive → API fallback, cached 6 h
+# Core loader: one Drive listing, then Drive → API fallback cached 6 h per region
 # ─────────────────────────────────────────────────────────────────────────────
-@st.cache_data(show_spinner=True, ttl=6 * 60 * 60)
-def load_all_regions(start_ms, end_ms):
+@st.cache_data(show_spinner=False, ttl=6 * 60 * 60)
+def _drive_region_files():
+    # {region: {filename: id}} from one folder query + one OR-joined listing;
+    # None when Drive isn't configured
     service, root_folder_id = _get_drive_handles()
-    results = {}
+    if not DRIVE_AVAILABLE or service is None:
+        return None
+    return list_cached_files(service, list(REGIONS), root_folder_id)
 
-    for region, url in REGIONS.items():
 
-        # 1. Try Drive cache
-        if DRIVE_AVAILABLE and service is not None:
-            try:
-                results[region] = load_cached_data(
-                    service, region, root_folder_id, start_ms, end_ms
-                )
-                continue                        # success → next region
-            except Exception as exc:
-                st.warning(
-                    f"Drive cache failed for **{region}** ({exc}). "
-                    f"Fetching from live API…"
-                )
+@st.cache_data(show_spinner=False, ttl=6 * 60 * 60)
+def _load_region_drive(region, start_ms, end_ms, file_ids):
+    service, root_folder_id = _get_drive_handles()
+    return _prepare_frames(
+        load_cached_data(service, region, root_folder_id, start_ms, end_ms, file_ids)
+    )
 
-        # 2. Fallback: live API
-        results[region] = run_region_cached_with_range(region, url, start_ms, end_ms)
 
-    return results
+@st.cache_data(show_spinner=False, ttl=6 * 60 * 60)
+def _load_region_api(region, url, start_ms, end_ms):
+    return _prepare_frames(run_region_cached_with_range(region, url, start_ms, end_ms))
+
+
+def _load_region(region, url, start_ms, end_ms, region_files):
+    # Returns (data, warning); st.* calls are not thread-safe, so the caller emits it.
+    # Each source is cached per region, so one stale or failed region refetches alone
+    if region_files is None:
+        return _load_region_api(region, url, start_ms, end_ms), None
+    if region not in region_files:
+        warning = f"No Drive cache for **{region}**. Fetching from live API…"
+    else:
+        try:
+            return _load_region_drive(region, start_ms, end_ms, region_files[region]), None
+        except Exception as exc:
+            warning = f"Drive cache failed for **{region}** ({exc}). Fetching from live API…"
+    return _load_region_api(region, url, start_ms, end_ms), warning
+
+
+def load_all_regions(start_ms, end_ms):
+    try:
+        region_files = _drive_region_files()
+    except Exception as exc:
+        st.warning(f"Drive listing failed ({exc}). Fetching from live API…")
+        region_files = None
+
+    results  = {}
+    warnings = []
+
+    # Regions are independent, network-bound round trips — fetch them concurrently
+    with _script_executor(len(REGIONS)) as ex:
+        futures = {
+            ex.submit(_load_region, region, url, start_ms, end_ms, region_files): region
+            for region, url in REGIONS.items()
+        }
+        for fut in as_completed(futures):
+            data, warning = fut.result()
+            results[futures[fut]] = data
+            if warning:
+                warnings.append(warning)
+
+    for msg in warnings:
+        st.warning(msg)
+
+    # Flat {(region, key): df}, keeping the REGIONS ordering regardless of completion order
+    return {
+        (region, key): df
+        for region in REGIONS
+        for key, df in results[region].items()
+    }
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -158,6 +275,8 @@ clear_api_errors()
 
 with st.spinner("Fetching data from Dashboard APIs..."):
     RESULTS = load_all_regions(start_time_ms, end_time_ms)
+    # Per-region {key: df} views, bound once so tabs don't rescan the flat dict
+    REGION_RESULTS = {region: region_results(RESULTS, region) for region in REGIONS}
 
     api_errors = get_api_errors()
     if api_errors:
@@ -171,24 +290,23 @@ with st.spinner("Fetching data from Dashboard APIs..."):
 # ─────────────────────────────────────────────────────────────────────────────
 # Data helpers
 # ─────────────────────────────────────────────────────────────────────────────
-def filter_data_by_date_range(results, start_ms, end_ms):
-    filtered = {}
-    for region, data in results.items():
-        filtered[region] = {}
-        for key, df in data.items():
-            if df is None or (isinstance(df, pd.DataFrame) and df.empty):
-                filtered[region][key] = df
-                continue
-            if isinstance(df, pd.DataFrame) and 'time_ms' in df.columns:
-                filtered[region][key] = df[
-                    (df['time_ms'] >= start_ms) &
-                    (df['time_ms'] <= end_ms)
-                ].copy()
-            else:
-                filtered[region][key] = df
-    return filtered
+def _hash_df(df):
+    # st.cache_data hash for DataFrames; list/dict cells (usfs, tags) fall back to str
+    try:
+        h = pd.util.hash_pandas_object(df, index=True)
+    except TypeError:
+        h = pd.util.hash_pandas_object(df.astype(str), index=True)
+    return tuple(df.columns), int(h.sum())
 
 
+def _usfs_filter(df):
+    # Rows tagged usfs/cusfs; the mask is computed once and reused by every consumer
+    if df.empty or "usfs" not in df.columns:
+        return df.iloc[:0]   # zero-row slice of the same schema, no new frame
+    return df.iloc[usfs_mask(df["usfs"]).nonzero()[0]]
+
+
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False, hash_funcs={pd.DataFrame: _hash_df})
 def build_fuel_summary_values(fill_daily, theft_daily):
     total_theft  = theft_daily["amount"].sum() if not theft_daily.empty else 0
     total_refill = fill_daily["amount"].sum()  if not fill_daily.empty  else 0
@@ -197,43 +315,60 @@ def build_fuel_summary_values(fill_daily, theft_daily):
     return [round(total_theft, 2), round(total_refill, 2), mv_avg_theft, mv_avg_refill]
 
 
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False, hash_funcs={pd.DataFrame: _hash_df})
 def build_lng_cng_ratio(fill_raw):
     if fill_raw.empty or "fuel_type" not in fill_raw.columns:
         return None, None
 
-    def calc_ratio(df):
-        if df.empty:
+    # Lower-case the column once, then work on plain boolean arrays
+    ft = fill_raw["fuel_type"].astype("string[pyarrow]").str.lower()
+    is_lng = (ft == "lng").to_numpy(dtype=bool, na_value=False)
+    is_cng = (ft == "cng").to_numpy(dtype=bool, na_value=False)
+
+    has_amount = fill_raw["amount"].notna().to_numpy()
+    has_kgs = (
+        fill_raw["Amount_kgs"].notna().to_numpy()
+        if "Amount_kgs" in fill_raw.columns else np.zeros(len(fill_raw), dtype=bool)
+    )
+
+    def calc_ratio(is_type):
+        if not is_type.any():
             return None
-        total = df["amount"].count()
-        kgs = df["Amount_kgs"].count() if "Amount_kgs" in df.columns else 0
+        total = int(has_amount[is_type].sum())
+        kgs = int(has_kgs[is_type].sum())
         return round((kgs / total) * 100, 2) if total else None
 
-    lng_df = fill_raw[fill_raw["fuel_type"].str.lower() == "lng"]
-    cng_df = fill_raw[fill_raw["fuel_type"].str.lower() == "cng"]
-    return calc_ratio(lng_df), calc_ratio(cng_df)
+    return calc_ratio(is_lng), calc_ratio(is_cng)
+
 
+def ignored_count(df, column):
+    """Number of rows flagged ignored, without materialising the filtered frame."""
+    if df.empty or column not in df.columns:
+        return 0
+    return int((df[column].to_numpy() == True).sum())
 
-def build_tp_fp_table(refill_df, theft_df, ignored_refill_df, ignored_theft_df):
-    total_refills   = len(refill_df)
-    total_thefts    = len(theft_df)
-    ignored_refills = len(ignored_refill_df)
-    ignored_thefts  = len(ignored_theft_df)
 
-    tp_refill = (total_refills  - ignored_refills) / total_refills  * 100 if total_refills  else 0
-    fp_refill = ignored_refills / total_refills  * 100                     if total_refills  else 0
-    tp_theft  = (total_thefts   - ignored_thefts)  / total_thefts   * 100 if total_thefts   else 0
-    fp_theft  = ignored_thefts  / total_thefts   * 100                     if total_thefts   else 0
+def build_tp_fp_table(total_refills, ignored_refills, total_thefts, ignored_thefts):
+    # Rates as one small vector op: [TP refill, FP refill, TP theft, FP theft]
+    totals  = np.array([total_refills, total_refills, total_thefts, total_thefts], dtype=float)
+    counts  = np.array([
+        total_refills - ignored_refills, ignored_refills,
+        total_thefts  - ignored_thefts,  ignored_thefts,
+    ], dtype=float)
+    rates = np.round(
+        np.divide(counts * 100, totals, out=np.zeros(4), where=totals > 0), 2
+    ).tolist()
 
     return [
-        ignored_refills, total_refills, round(tp_refill, 2), round(fp_refill, 2),
-        ignored_thefts,  total_thefts,  round(tp_theft,  2), round(fp_theft,  2),
+        ignored_refills, total_refills, rates[0], rates[1],
+        ignored_thefts,  total_thefts,  rates[2], rates[3],
     ]
 
 
 def build_combined_data_loss_summary(results):
     rows = []
-    for region, data in results.items():
-        summary = data.get("data_loss_summary", pd.DataFrame())
+    for region in REGIONS:
+        summary = results.get((region, "data_loss_summary"), pd.DataFrame())
         if summary is not None and not summary.empty:
             tmp = summary.copy()
             tmp["Region"] = region
@@ -244,69 +379,69 @@ def build_combined_data_loss_summary(results):
     return final_df[["Region", "Data loss type", "Count"]]
 
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Chart builders  (identical to original — untouched)
-# ─────────────────────────────────────────────────────────────────────────────
-def create_plot(df, title, unit):
-    fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+CSV_CHUNK_ROWS = 100_000
 
-    fig.add_trace(go.Scatter(
-        x=df["time"], y=df["amount"],
-        mode="markers+lines", name="Amount",
-        line=dict(width=4), marker=dict(size=14)
-    ))
 
-    if "moving average" in df.columns:
-        fig.add_trace(go.Scatter(
-            x=df["time"], y=df["moving average"],
-            mode="lines", name="Moving Avg",
-            line=dict(dash="dot", color="green", width=2)
-        ))
+def _to_csv_bytes(df):
+    # Encode straight into a bytes buffer — no intermediate full-size str
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, encoding="utf-8", chunksize=CSV_CHUNK_ROWS)
+    return buf.getvalue()
 
-    total = df["amount"].sum()
-    avg   = total / len(df) if len(df) else 0
-    y_max = max(
-        df["amount"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
-    ) * 1.3
 
-    fig.update_layout(
-        title={
-            "text": (
-                f"<b style='font-size:30px'>{title}</b><br>"
-                f"<span style='font-size:26px'>Total: {total:.2f} | Avg/Day: {avg:.2f}</span>"
-            ),
-            "x": 0.5, "xanchor": "center"
-        },
-        xaxis_title="Date", yaxis_title=unit,
-        xaxis=dict(
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray',
-            tickmode='linear', dtick=86400000,
-            tickformat='%b %d\n%Y', tickangle=-45
-        ),
-        yaxis=dict(
-            range=[0, y_max],
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray'
-        ),
-        height=450, margin=dict(t=100, b=40, l=60, r=60), showlegend=False
+def _encode_chunk(label, df, cols, header=False):
+    # One dataset's rows, aligned to the combined column list, with Data_Type first
+    aligned = df.reindex(columns=cols)
+    aligned.insert(0, "Data_Type", label)
+    buf = io.BytesIO()
+    # Formatted CSV_CHUNK_ROWS rows at a time, so peak memory tracks the batch, not the frame
+    aligned.to_csv(buf, index=False, header=header, encoding="utf-8", chunksize=CSV_CHUNK_ROWS)
+    return buf.getvalue()
+
+
+def _stream_combined_csv(tagged):
+    # (label, df) pairs → one CSV; encoded one dataset at a time (to_csv's formatting
+    # holds the GIL, so threads wouldn't help) and the bytes joined once
+    tagged = list(tagged)
+    cols = list(dict.fromkeys(c for _, df in tagged for c in df.columns))
+    return b"".join(
+        _encode_chunk(label, df, cols, header=(i == 0))
+        for i, (label, df) in enumerate(tagged)
     )
-    return fig
 
 
-def create_plot_usfs(df, title, unit):
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False, hash_funcs={pd.DataFrame: _hash_df})
+def _csv_bytes(df):
+    # Serialised once per frame content, not on every rerun that reaches a download button
+    return _to_csv_bytes(df)
+
+
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False, hash_funcs={pd.DataFrame: _hash_df})
+def _plot_stats(df, y_col):
+    # Total / Avg-per-day / y-axis max for a daily series, cached on the frame's content
+    # (not stashed in df.attrs, which pandas copies onto filtered/concatenated frames)
+    y = df[y_col].to_numpy(dtype=float)
+    total = float(np.nansum(y))
+    y_max = float(np.nanmax(y)) if len(y) else 0.0
+    if "moving average" in df.columns and len(df):
+        y_max = max(y_max, float(np.nanmax(df["moving average"].to_numpy(dtype=float))))
+    return {
+        "total": total,
+        "avg":   total / len(y) if len(y) else 0,
+        "y_max": y_max,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Chart builders — cached per (df content, title, unit); cleared by Refresh
+# ─────────────────────────────────────────────────────────────────────────────
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False, hash_funcs={pd.DataFrame: _hash_df})
+def _build_line_plot(df, title, unit, y_col="amount", height=450, name="Amount"):
     fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
 
     fig.add_trace(go.Scatter(
-        x=df["time"], y=df["amount"],
-        mode="markers+lines", name="Amount",
+        x=df["time"], y=df[y_col],
+        mode="markers+lines", name=name,
         line=dict(width=4), marker=dict(size=14)
     ))
 
@@ -317,12 +452,9 @@ def create_plot_usfs(df, title, unit):
             line=dict(dash="dot", color="green", width=2)
         ))
 
-    total = df["amount"].sum()
-    avg   = total / len(df) if len(df) else 0
-    y_max = max(
-        df["amount"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
-    ) * 1.3
+    stats = _plot_stats(df, y_col)
+    total, avg = stats["total"], stats["avg"]
+    y_max = stats["y_max"] * 1.3
 
     fig.update_layout(
         title={
@@ -346,15 +478,14 @@ def create_plot_usfs(df, title, unit):
             tickfont=dict(size=17, color='black', family='Arial Black'),
             showgrid=True, gridcolor='lightgray'
         ),
-        height=420, margin=dict(t=100, b=40, l=60, r=60), showlegend=False
+        height=height, margin=dict(t=100, b=40, l=60, r=60), showlegend=False
     )
     return fig
 
 
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False, hash_funcs={pd.DataFrame: _hash_df})
 def create_plot_low_fuel(df, title):
     fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
 
     fig.add_trace(go.Scatter(
         x=df["time"], y=df["vehicle_id"],
@@ -369,12 +500,9 @@ def create_plot_low_fuel(df, title):
             line=dict(dash="dot", color="red", width=4)
         ))
 
-    total = df["vehicle_id"].sum()
-    avg   = total / len(df) if len(df) else 0
-    y_max = max(
-        df["vehicle_id"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
-    ) * 1.3
+    stats = _plot_stats(df, "vehicle_id")
+    total, avg = stats["total"], stats["avg"]
+    y_max = stats["y_max"] * 1.3
 
     fig.update_layout(
         title={
@@ -403,58 +531,6 @@ def create_plot_low_fuel(df, title):
     return fig
 
 
-def create_plot_pv(df, title, unit):
-    fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-
-    fig.add_trace(go.Scatter(
-        x=df["time"], y=df["probable_variation_max"],
-        mode="markers+lines", name="Probable Variation",
-        line=dict(width=4), marker=dict(size=14)
-    ))
-
-    if "moving average" in df.columns:
-        fig.add_trace(go.Scatter(
-            x=df["time"], y=df["moving average"],
-            mode="lines", name="Moving Avg",
-            line=dict(dash="dot", color="green", width=2)
-        ))
-
-    total = df["probable_variation_max"].sum()
-    avg   = total / len(df) if len(df) else 0
-    y_max = max(
-        df["probable_variation_max"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
-    ) * 1.3
-
-    fig.update_layout(
-        title={
-            "text": (
-                f"<b style='font-size:30px'>{title}</b><br>"
-                f"<span style='font-size:26px'>Total: {total:.2f} | Avg/Day: {avg:.2f}</span>"
-            ),
-            "x": 0.5, "xanchor": "center"
-        },
-        xaxis_title="Date", yaxis_title=unit,
-        xaxis=dict(
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray',
-            tickmode='linear', dtick=86400000,
-            tickformat='%b %d\n%Y', tickangle=-45
-        ),
-        yaxis=dict(
-            range=[0, y_max],
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray'
-        ),
-        height=420, margin=dict(t=100, b=40, l=60, r=60), showlegend=False
-    )
-    return fig
-
-
 # ─────────────────────────────────────────────────────────────────────────────
 # Tabs + unit map
 # ─────────────────────────────────────────────────────────────────────────────
@@ -464,75 +540,58 @@ TAB_NAMES = [
     "FUEL SUMMARY", "DATA LOSS", "MAIN DASHBOARD", "EXPORT DATA", "📅 TIME RANGE EXPORT"
 ]
 
-# Persist active tab index across reruns
+# ─────────────────────────────────────────────────────────────────────────────
+# Static HTML — built once at import, reused on every rerun
+# ─────────────────────────────────────────────────────────────────────────────
+LEGEND_HTML = """
+<div style="
+    background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+    padding: 15px 30px; border-radius: 10px; margin-bottom: 20px;
+    text-align: center; box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+">
+    <span style="font-size:18px;font-weight:bold;color:#333;margin-right:30px;">Legend:</span>
+    <span style="font-size:19px;color:#1e88e5;margin-right:25px;">
+        <span style="display:inline-block;width:40px;height:3px;background:#1e88e5;vertical-align:middle;margin-right:8px;"></span>
+        <strong>Amount / Alert Count</strong>
+    </span>
+    <span style="font-size:19px;color:#43a047;">
+        <span style="display:inline-block;width:40px;height:3px;background:#43a047;border-top:2px dotted #43a047;vertical-align:middle;margin-right:8px;"></span>
+        <strong>Moving Average</strong>
+    </span>
+</div>
+"""
+
+# Persist active tab index across reruns; a ?tab=<index> link picks the first one
 if "active_tab" not in st.session_state:
     st.session_state.active_tab = 0
-
-# JavaScript: on every load, re-click whichever tab was last active.
-# We target the stTabs button list and click by index after a short delay
-# so Streamlit has time to render the DOM first.
-_active = st.session_state.active_tab
-st.markdown(
-    f"""
-    <script>
-    (function() {{
-        const TARGET_IDX = {_active};
-        function clickTab() {{
-            const tabs = window.parent.document.querySelectorAll('[data-testid="stTabs"] button[role="tab"]');
-            if (tabs.length > TARGET_IDX) {{
-                tabs[TARGET_IDX].click();
-            }} else {{
-                setTimeout(clickTab, 100);
-            }}
-        }}
-        // Small delay so Streamlit DOM is ready
-        setTimeout(clickTab, 120);
-    }})();
-    </script>
-    """,
-    unsafe_allow_html=True
-)
-
-tabs = st.tabs(TAB_NAMES)
-
-# ── Tab-click tracker: inject JS that writes the clicked tab index
-# into a hidden st.query_params key so we can read it on next rerun.
-# Streamlit re-runs whenever query_params change, but we only update
-# session_state here — we do NOT force a rerun from the tracker itself.
-_qp = st.query_params.to_dict()
-if "tab" in _qp:
     try:
-        _idx = int(_qp["tab"])
+        _idx = int(st.query_params.get("tab", 0))
         if 0 <= _idx < len(TAB_NAMES):
             st.session_state.active_tab = _idx
     except (ValueError, TypeError):
         pass
 
-# Inject click listeners that push tab index into query params
-st.markdown(
-    f"""
-    <script>
-    (function() {{
-        function attachListeners() {{
-            const tabBtns = window.parent.document.querySelectorAll('[data-testid="stTabs"] button[role="tab"]');
-            if (tabBtns.length === 0) {{
-                setTimeout(attachListeners, 150);
-                return;
-            }}
-            tabBtns.forEach(function(btn, idx) {{
-                btn.addEventListener('click', function() {{
-                    const url = new URL(window.parent.location.href);
-                    url.searchParams.set('tab', idx);
-                    window.parent.history.replaceState(null, '', url.toString());
-                }});
-            }});
-        }}
-        setTimeout(attachListeners, 300);
-    }})();
-    </script>
-    """,
-    unsafe_allow_html=True
+
+def _sync_tab_param():
+    st.query_params["tab"] = str(st.session_state.active_tab)
+
+
+# The selector is a real widget, so switching sections reruns the script with
+# the new index already in session_state — no client-side tab tracking needed
+st.radio(
+    "Section", options=range(len(TAB_NAMES)), format_func=TAB_NAMES.__getitem__,
+    key="active_tab", horizontal=True, label_visibility="collapsed",
+    on_change=_sync_tab_param,
 )
+tabs = [st.container() for _ in TAB_NAMES]
+
+
+def _render_if_active(tab_idx, render, *args):
+    # Only the selected tab's body runs on a rerun; the rest stay empty
+    if st.session_state.active_tab == tab_idx:
+        render(*args)
+    else:
+        st.empty()
 
 UNIT_MAP = {
     "IND":  "Liters",
@@ -552,112 +611,75 @@ REGION_DISPLAY_NAMES = {
 # ─────────────────────────────────────────────────────────────────────────────
 # Region tabs  (INDIA / NASA / EU / FML)
 # ─────────────────────────────────────────────────────────────────────────────
-for tab_idx, (tab, region) in enumerate(zip(tabs[:4], REGIONS.keys())):
-    with tab:
-        st.session_state.active_tab = tab_idx
-        region_label = REGION_DISPLAY_NAMES.get(region, region)
-        st.header(f"{region_label} Region Analysis")
-
-        st.markdown(
-            """
-            <div style="
-                background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-                padding: 15px 30px; border-radius: 10px; margin-bottom: 20px;
-                text-align: center; box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            ">
-                <span style="font-size:18px;font-weight:bold;color:#333;margin-right:30px;">Legend:</span>
-                <span style="font-size:19px;color:#1e88e5;margin-right:25px;">
-                    <span style="display:inline-block;width:40px;height:3px;background:#1e88e5;vertical-align:middle;margin-right:8px;"></span>
-                    <strong>Amount / Alert Count</strong>
-                </span>
-                <span style="font-size:19px;color:#43a047;">
-                    <span style="display:inline-block;width:40px;height:3px;background:#43a047;border-top:2px dotted #43a047;vertical-align:middle;margin-right:8px;"></span>
-                    <strong>Moving Average</strong>
-                </span>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-
-        unit = UNIT_MAP[region]
-
-        fill_daily      = RESULTS[region]["fill_daily"]
-        theft_daily     = RESULTS[region]["theft_daily"]
-        fill_cev_daily  = RESULTS[region]["fill_cev_daily"]
-        theft_cev_daily = RESULTS[region]["theft_cev_daily"]
-        fill_usfs       = RESULTS[region]["fill_usfs_daily"]
-        theft_usfs      = RESULTS[region]["theft_usfs_daily"]
-        fill_pv         = RESULTS[region]["fill_pv_daily"]
-        theft_pv        = RESULTS[region]["theft_pv_daily"]
-        low_fuel_daily  = RESULTS[region]["low_fuel_daily"]
-
-        st.subheader("Fuel Refill (DPL)")
-        if not fill_daily.empty:
-            st.plotly_chart(create_plot(fill_daily, f"{region_label} - Refill (DPL)", unit), True)
-        else:
-            st.info("No refill data")
-
-        st.subheader("Fuel Theft (DPL)")
-        if not theft_daily.empty:
-            st.plotly_chart(create_plot(theft_daily, f"{region_label} - Theft (DPL)", unit), True)
-        else:
-            st.info("No theft data")
-
-        st.markdown("---")
-        st.subheader("Fuel Refill (CEV/Off-Highway)")
-        if not fill_cev_daily.empty:
-            st.plotly_chart(create_plot(fill_cev_daily, f"{region_label} - Refill (CEV)", unit), True)
-        else:
-            st.info("No CEV refill data")
-
-        st.subheader("Fuel Theft (CEV/Off-Highway)")
-        if not theft_cev_daily.empty:
-            st.plotly_chart(create_plot(theft_cev_daily, f"{region_label} - Theft (CEV)", unit), True)
-        else:
-            st.info("No CEV theft data")
+@st.fragment
+def _render_region_tab(region):
+    region_label = REGION_DISPLAY_NAMES.get(region, region)
+    st.header(f"{region_label} Region Analysis")
+
+    st.markdown(LEGEND_HTML, unsafe_allow_html=True)
+
+    unit = UNIT_MAP[region]
+
+    R = REGION_RESULTS[region]
+    fill_daily      = R["fill_daily"]
+    theft_daily     = R["theft_daily"]
+    fill_cev_daily  = R["fill_cev_daily"]
+    theft_cev_daily = R["theft_cev_daily"]
+    fill_usfs       = R["fill_usfs_daily"]
+    theft_usfs      = R["theft_usfs_daily"]
+    fill_pv         = R["fill_pv_daily"]
+    theft_pv        = R["theft_pv_daily"]
+    low_fuel_daily  = R["low_fuel_daily"]
+
+    pv = dict(y_col="probable_variation_max", height=420, name="Probable Variation")
+    # (section break before, subheader, daily df, builder, title, builder kwargs, empty message)
+    charts = [
+        (False, "Fuel Refill (DPL)", fill_daily, _build_line_plot,
+         f"{region_label} - Refill (DPL)", dict(unit=unit), "No refill data"),
+        (False, "Fuel Theft (DPL)", theft_daily, _build_line_plot,
+         f"{region_label} - Theft (DPL)", dict(unit=unit), "No theft data"),
+        (True, "Fuel Refill (CEV/Off-Highway)", fill_cev_daily, _build_line_plot,
+         f"{region_label} - Refill (CEV)", dict(unit=unit), "No CEV refill data"),
+        (False, "Fuel Theft (CEV/Off-Highway)", theft_cev_daily, _build_line_plot,
+         f"{region_label} - Theft (CEV)", dict(unit=unit), "No CEV theft data"),
+        (True, "USFS Refill", fill_usfs, _build_line_plot,
+         f"{region_label} - USFS Refill", dict(unit=unit, height=420), "No USFS refill data"),
+        (False, "USFS Theft", theft_usfs, _build_line_plot,
+         f"{region_label} - USFS Theft", dict(unit=unit, height=420), "No USFS theft data"),
+        (True, "Probable Variation – Refill", fill_pv, _build_line_plot,
+         f"{region_label} - PV Refill", dict(unit=unit, **pv), "No PV refill data"),
+        (False, "Probable Variation – Theft", theft_pv, _build_line_plot,
+         f"{region_label} - PV Theft", dict(unit=unit, **pv), "No PV theft data"),
+        (True, "Low Fuel Level Alerts", low_fuel_daily, create_plot_low_fuel,
+         f"{region_label} - Low Fuel Alerts", {}, "No low fuel alerts"),
+    ]
 
-        st.markdown("---")
-        st.subheader("USFS Refill")
-        if not fill_usfs.empty:
-            st.plotly_chart(create_plot_usfs(fill_usfs, f"{region_label} - USFS Refill", unit), True)
+    # Lay out every header + placeholder first so the page structure appears at once,
+    # then fill the slots in order; the builders are cached, so repeat renders are cheap
+    jobs = []
+    for section_break, subheader, df, builder, title, kwargs, empty_msg in charts:
+        if section_break:
+            st.markdown("---")
+        st.subheader(subheader)
+        if df.empty:
+            st.info(empty_msg)
         else:
-            st.info("No USFS refill data")
+            jobs.append((st.empty(), builder, df, title, kwargs))
 
-        st.subheader("USFS Theft")
-        if not theft_usfs.empty:
-            st.plotly_chart(create_plot_usfs(theft_usfs, f"{region_label} - USFS Theft", unit), True)
-        else:
-            st.info("No USFS theft data")
+    for slot, builder, df, title, kwargs in jobs:
+        slot.plotly_chart(builder(df, title, **kwargs), use_container_width=True)
 
-        st.markdown("---")
-        st.subheader("Probable Variation – Refill")
-        if not fill_pv.empty:
-            st.plotly_chart(create_plot_pv(fill_pv, f"{region_label} - PV Refill", unit), True)
-        else:
-            st.info("No PV refill data")
 
-        st.subheader("Probable Variation – Theft")
-        if not theft_pv.empty:
-            st.plotly_chart(create_plot_pv(theft_pv, f"{region_label} - PV Theft", unit), True)
-        else:
-            st.info("No PV theft data")
-
-        st.markdown("---")
-        st.subheader("Low Fuel Level Alerts")
-        if not low_fuel_daily.empty:
-            st.plotly_chart(
-                create_plot_low_fuel(low_fuel_daily, f"{region_label} - Low Fuel Alerts"),
-                use_container_width=True
-            )
-        else:
-            st.info("No low fuel alerts")
+for tab_idx, (tab, region) in enumerate(zip(tabs[:4], REGIONS.keys())):
+    with tab:
+        _render_if_active(tab_idx, _render_region_tab, region)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # FUEL SUMMARY tab
 # ─────────────────────────────────────────────────────────────────────────────
-with tabs[4]:
-    st.session_state.active_tab = 4
+@st.fragment
+def _render_fuel_summary():
     st.markdown("<h2 style='text-align:center;'> Fuel Summary</h2>", unsafe_allow_html=True)
     st.markdown("---")
 
@@ -665,7 +687,7 @@ with tabs[4]:
         region_label = REGION_DISPLAY_NAMES.get(region, region)
         st.markdown(f"<h4 style='text-align:center;'>{region_label}</h4>", unsafe_allow_html=True)
 
-        data = RESULTS[region]
+        data = REGION_RESULTS[region]
 
         dpl_values = build_fuel_summary_values(data["fill_daily"], data["theft_daily"])
         cev_values = build_fuel_summary_values(data["fill_cev_daily"], data["theft_cev_daily"])
@@ -698,22 +720,21 @@ with tabs[4]:
 
         st.markdown("---")
 
+        fill_raw, theft_raw = data["fill_raw"], data["theft_raw"]
+        fill_cev, theft_cev = data["fill_cev"], data["theft_cev"]
+
         dpl_values = build_tp_fp_table(
-            refill_df=data["fill_raw"],
-            theft_df=data["theft_raw"],
-            ignored_refill_df=data["fill_raw"][data["fill_raw"]["alert_fuel_filling_ignore"] == True]
-                if "alert_fuel_filling_ignore" in data["fill_raw"] else pd.DataFrame(),
-            ignored_theft_df=data["theft_raw"][data["theft_raw"]["alert_fuel_theft_ignore"] == True]
-                if "alert_fuel_theft_ignore" in data["theft_raw"] else pd.DataFrame(),
+            total_refills=len(fill_raw),
+            ignored_refills=ignored_count(fill_raw, "alert_fuel_filling_ignore"),
+            total_thefts=len(theft_raw),
+            ignored_thefts=ignored_count(theft_raw, "alert_fuel_theft_ignore"),
         )
 
         cev_values = build_tp_fp_table(
-            refill_df=data["fill_cev"],
-            theft_df=data["theft_cev"],
-            ignored_refill_df=data["fill_cev"][data["fill_cev"]["alert_fuel_filling_ignore"] == True]
-                if "alert_fuel_filling_ignore" in data["fill_cev"] and not data["fill_cev"].empty else pd.DataFrame(),
-            ignored_theft_df=data["theft_cev"][data["theft_cev"]["alert_fuel_theft_ignore"] == True]
-                if "alert_fuel_theft_ignore" in data["theft_cev"] and not data["theft_cev"].empty else pd.DataFrame(),
+            total_refills=len(fill_cev),
+            ignored_refills=ignored_count(fill_cev, "alert_fuel_filling_ignore"),
+            total_thefts=len(theft_cev),
+            ignored_thefts=ignored_count(theft_cev, "alert_fuel_theft_ignore"),
         )
 
         rate_df = pd.DataFrame({
@@ -725,16 +746,20 @@ with tabs[4]:
         st.markdown("---")
 
 
+with tabs[4]:
+    _render_if_active(4, _render_fuel_summary)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # DATA LOSS tab
 # ─────────────────────────────────────────────────────────────────────────────
-with tabs[5]:
-    st.session_state.active_tab = 5
+@st.fragment
+def _render_data_loss():
     st.markdown("<h2 style='text-align:center;'> Data Loss Summary</h2>", unsafe_allow_html=True)
 
     for region in REGIONS.keys():
         region_label = REGION_DISPLAY_NAMES.get(region, region)
-        summary = RESULTS[region].get("data_loss_summary", pd.DataFrame())
+        summary = REGION_RESULTS[region].get("data_loss_summary", pd.DataFrame())
         st.markdown(f"<h4 style='text-align:center;'>{region_label} Region</h4>", unsafe_allow_html=True)
         if not summary.empty:
             st.dataframe(summary, use_container_width=True, hide_index=True)
@@ -743,11 +768,14 @@ with tabs[5]:
         st.markdown("---")
 
 
+with tabs[5]:
+    _render_if_active(5, _render_data_loss)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # MAIN DASHBOARD tab
 # ─────────────────────────────────────────────────────────────────────────────
-with tabs[6]:
-    st.session_state.active_tab = 6
+def _render_main_dashboard_link():
     st.markdown(
         """
         <script>
@@ -766,11 +794,15 @@ with tabs[6]:
     )
 
 
+with tabs[6]:
+    _render_if_active(6, _render_main_dashboard_link)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # EXPORT DATA tab
 # ─────────────────────────────────────────────────────────────────────────────
-with tabs[7]:
-    st.session_state.active_tab = 7   # record we're on this tab
+@st.fragment
+def _render_export():
     st.markdown("<h2 style='text-align:center;'>📥 Export Dashboard Data</h2>", unsafe_allow_html=True)
     st.markdown("---")
     st.info(
@@ -787,47 +819,74 @@ with tabs[7]:
     )
     st.markdown("---")
 
+    # File names and widget keys for every download on this tab, built once per render
+    file_names = {name: f"{export_region}_{name}_{DATE_TAG}.csv" for name in EXPORT_KEYS}
+    widget_keys = {name: f"{key}_{export_region}" for name, key in EXPORT_KEYS.items()}
+
+    R = REGION_RESULTS[export_region]
+    theft_raw, fill_raw, theft_cev, fill_cev, low_fuel_raw, data_loss_raw = (
+        R[k] for k in ("theft_raw", "fill_raw", "theft_cev", "fill_cev", "low_fuel_raw", "data_loss_raw")
+    )
+
+    if all(df.empty for df in (theft_raw, fill_raw, theft_cev, fill_cev, low_fuel_raw, data_loss_raw)):
+        st.info(f"No data available for {export_region} in the selected date range.")
+        return
+
+    # Derived subsets, computed once and shared by their buttons and the combined export
+    pv_theft = (
+        theft_raw.loc[theft_raw["probable_variation_max"].notna().to_numpy()]
+        if "probable_variation_max" in theft_raw.columns
+        else theft_raw.iloc[:0]
+    )
+    pv_fill = (
+        fill_raw.loc[fill_raw["probable_variation_max"].notna().to_numpy()]
+        if "probable_variation_max" in fill_raw.columns
+        else fill_raw.iloc[:0]
+    )
+    usfs_theft = _usfs_filter(theft_raw)
+    usfs_fill  = _usfs_filter(fill_raw)
+
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("🚛 DPL Data (On-Highway)")
-        if not RESULTS[export_region]["theft_raw"].empty:
+        if not theft_raw.empty:
             st.download_button(
-                label=f"📥 Download DPL Theft Alerts ({len(RESULTS[export_region]['theft_raw'])} records)",
-                data=RESULTS[export_region]["theft_raw"].to_csv(index=False),
-                file_name=f"{export_region}_DPL_Theft_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_theft_{export_region}"
+                label=f"📥 Download DPL Theft Alerts ({len(theft_raw)} records)",
+                data=lambda df=theft_raw: _csv_bytes(df),
+                file_name=file_names["DPL_Theft"],
+                mime="text/csv", key=widget_keys["DPL_Theft"]
             )
         else:
             st.info("No DPL theft data available")
 
-        if not RESULTS[export_region]["fill_raw"].empty:
+        if not fill_raw.empty:
             st.download_button(
-                label=f"📥 Download DPL Filling Alerts ({len(RESULTS[export_region]['fill_raw'])} records)",
-                data=RESULTS[export_region]["fill_raw"].to_csv(index=False),
-                file_name=f"{export_region}_DPL_Filling_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_fill_{export_region}"
+                label=f"📥 Download DPL Filling Alerts ({len(fill_raw)} records)",
+                data=lambda df=fill_raw: _csv_bytes(df),
+                file_name=file_names["DPL_Filling"],
+                mime="text/csv", key=widget_keys["DPL_Filling"]
             )
         else:
             st.info("No DPL filling data available")
 
     with col2:
         st.subheader("🚜 CEV Data (Off-Highway)")
-        if not RESULTS[export_region]["theft_cev"].empty:
+        if not theft_cev.empty:
             st.download_button(
-                label=f"📥 Download CEV Theft Alerts ({len(RESULTS[export_region]['theft_cev'])} records)",
-                data=RESULTS[export_region]["theft_cev"].to_csv(index=False),
-                file_name=f"{export_region}_CEV_Theft_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_theft_cev_{export_region}"
+                label=f"📥 Download CEV Theft Alerts ({len(theft_cev)} records)",
+                data=lambda df=theft_cev: _csv_bytes(df),
+                file_name=file_names["CEV_Theft"],
+                mime="text/csv", key=widget_keys["CEV_Theft"]
             )
         else:
             st.info("No CEV theft data available")
 
-        if not RESULTS[export_region]["fill_cev"].empty:
+        if not fill_cev.empty:
             st.download_button(
-                label=f"📥 Download CEV Filling Alerts ({len(RESULTS[export_region]['fill_cev'])} records)",
-                data=RESULTS[export_region]["fill_cev"].to_csv(index=False),
-                file_name=f"{export_region}_CEV_Filling_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_fill_cev_{export_region}"
+                label=f"📥 Download CEV Filling Alerts ({len(fill_cev)} records)",
+                data=lambda df=fill_cev: _csv_bytes(df),
+                file_name=file_names["CEV_Filling"],
+                mime="text/csv", key=widget_keys["CEV_Filling"]
             )
         else:
             st.info("No CEV filling data available")
@@ -837,37 +896,23 @@ with tabs[7]:
     col3, col4 = st.columns(2)
 
     with col3:
-        pv_theft = (
-            RESULTS[export_region]["theft_raw"][
-                ~RESULTS[export_region]["theft_raw"]["probable_variation_max"].isna()
-            ]
-            if "probable_variation_max" in RESULTS[export_region]["theft_raw"].columns
-            else pd.DataFrame()
-        )
         if not pv_theft.empty:
             st.download_button(
                 label=f"📥 Download PV Theft ({len(pv_theft)} records)",
-                data=pv_theft.to_csv(index=False),
-                file_name=f"{export_region}_PV_Theft_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_pv_theft_{export_region}"
+                data=lambda df=pv_theft: _csv_bytes(df),
+                file_name=file_names["PV_Theft"],
+                mime="text/csv", key=widget_keys["PV_Theft"]
             )
         else:
             st.info("No probable variation theft data available")
 
     with col4:
-        pv_fill = (
-            RESULTS[export_region]["fill_raw"][
-                ~RESULTS[export_region]["fill_raw"]["probable_variation_max"].isna()
-            ]
-            if "probable_variation_max" in RESULTS[export_region]["fill_raw"].columns
-            else pd.DataFrame()
-        )
         if not pv_fill.empty:
             st.download_button(
                 label=f"📥 Download PV Filling ({len(pv_fill)} records)",
-                data=pv_fill.to_csv(index=False),
-                file_name=f"{export_region}_PV_Filling_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_pv_fill_{export_region}"
+                data=lambda df=pv_fill: _csv_bytes(df),
+                file_name=file_names["PV_Filling"],
+                mime="text/csv", key=widget_keys["PV_Filling"]
             )
         else:
             st.info("No probable variation filling data available")
@@ -876,33 +921,24 @@ with tabs[7]:
     st.subheader("🏷️ USFS Tagged Data")
     col5, col6 = st.columns(2)
 
-    def _usfs_filter(df):
-        if "usfs" not in df.columns or df.empty:
-            return pd.DataFrame()
-        return df[df["usfs"].apply(
-            lambda x: isinstance(x, list) and any(v in ["usfs", "cusfs"] for v in x) if x else False
-        )]
-
     with col5:
-        usfs_theft = _usfs_filter(RESULTS[export_region]["theft_raw"])
         if not usfs_theft.empty:
             st.download_button(
                 label=f"📥 Download USFS Theft ({len(usfs_theft)} records)",
-                data=usfs_theft.to_csv(index=False),
-                file_name=f"{export_region}_USFS_Theft_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_usfs_theft_{export_region}"
+                data=lambda df=usfs_theft: _csv_bytes(df),
+                file_name=file_names["USFS_Theft"],
+                mime="text/csv", key=widget_keys["USFS_Theft"]
             )
         else:
             st.info("No USFS theft data available")
 
     with col6:
-        usfs_fill = _usfs_filter(RESULTS[export_region]["fill_raw"])
         if not usfs_fill.empty:
             st.download_button(
                 label=f"📥 Download USFS Filling ({len(usfs_fill)} records)",
-                data=usfs_fill.to_csv(index=False),
-                file_name=f"{export_region}_USFS_Filling_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_usfs_fill_{export_region}"
+                data=lambda df=usfs_fill: _csv_bytes(df),
+                file_name=file_names["USFS_Filling"],
+                mime="text/csv", key=widget_keys["USFS_Filling"]
             )
         else:
             st.info("No USFS filling data available")
@@ -912,23 +948,23 @@ with tabs[7]:
     col7, col8 = st.columns(2)
 
     with col7:
-        if not RESULTS[export_region]["low_fuel_raw"].empty:
+        if not low_fuel_raw.empty:
             st.download_button(
-                label=f"📥 Download Low Fuel Alerts ({len(RESULTS[export_region]['low_fuel_raw'])} records)",
-                data=RESULTS[export_region]["low_fuel_raw"].to_csv(index=False),
-                file_name=f"{export_region}_Low_Fuel_Alerts_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_low_fuel_{export_region}"
+                label=f"📥 Download Low Fuel Alerts ({len(low_fuel_raw)} records)",
+                data=lambda df=low_fuel_raw: _csv_bytes(df),
+                file_name=file_names["Low_Fuel_Alerts"],
+                mime="text/csv", key=widget_keys["Low_Fuel_Alerts"]
             )
         else:
             st.info("No low fuel alert data available")
 
     with col8:
-        if not RESULTS[export_region]["data_loss_raw"].empty:
+        if not data_loss_raw.empty:
             st.download_button(
-                label=f"📥 Download Data Loss Alerts ({len(RESULTS[export_region]['data_loss_raw'])} records)",
-                data=RESULTS[export_region]["data_loss_raw"].to_csv(index=False),
-                file_name=f"{export_region}_Data_Loss_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"download_data_loss_{export_region}"
+                label=f"📥 Download Data Loss Alerts ({len(data_loss_raw)} records)",
+                data=lambda df=data_loss_raw: _csv_bytes(df),
+                file_name=file_names["Data_Loss"],
+                mime="text/csv", key=widget_keys["Data_Loss"]
             )
         else:
             st.info("No data loss events available")
@@ -937,44 +973,38 @@ with tabs[7]:
     st.subheader("📦 Combined Export")
     st.markdown("Download all available data for the selected region in a single CSV file with a 'Data Type' column.")
 
-    if st.button(f"📦 Generate Combined Export for {export_region}", key=f"combined_export_{export_region}"):
-        all_data = []
-
-        def _tag(df, label):
-            if not df.empty:
-                d = df.copy()
-                d["Data_Type"] = label
-                all_data.append(d)
-
-        _tag(RESULTS[export_region]["theft_raw"], "DPL_Theft")
-        _tag(RESULTS[export_region]["fill_raw"],  "DPL_Filling")
-        _tag(RESULTS[export_region]["theft_cev"], "CEV_Theft")
-        _tag(RESULTS[export_region]["fill_cev"],  "CEV_Filling")
-
-        if not pv_theft.empty:
-            _tag(pv_theft, "PV_Theft")
-        if not pv_fill.empty:
-            _tag(pv_fill,  "PV_Filling")
-
-        _tag(_usfs_filter(RESULTS[export_region]["theft_raw"]), "USFS_Theft")
-        _tag(_usfs_filter(RESULTS[export_region]["fill_raw"]),  "USFS_Filling")
-        _tag(RESULTS[export_region]["low_fuel_raw"],  "Low_Fuel_Alert")
-        _tag(RESULTS[export_region]["data_loss_raw"], "Data_Loss")
+    # Every dataset that goes into the combined file, in output order
+    combined_parts = [
+        (theft_raw,     "DPL_Theft"),
+        (fill_raw,      "DPL_Filling"),
+        (theft_cev,     "CEV_Theft"),
+        (fill_cev,      "CEV_Filling"),
+        (pv_theft,      "PV_Theft"),
+        (pv_fill,       "PV_Filling"),
+        (usfs_theft,    "USFS_Theft"),
+        (usfs_fill,     "USFS_Filling"),
+        (low_fuel_raw,  "Low_Fuel_Alert"),
+        (data_loss_raw, "Data_Loss"),
+    ]
+    combined_total = sum(len(df) for df, _ in combined_parts)
+
+    def _combined_csv(parts=combined_parts):
+        # Runs only when the download is clicked
+        return _stream_combined_csv((label, df) for df, label in parts if not df.empty)
+
+    if combined_total:
+        st.download_button(
+            label=f"⬇️ Download {export_region} Combined Export (CSV) — {combined_total:,} records",
+            data=_combined_csv,
+            file_name=file_names["Combined_Export"],
+            mime="text/csv", key=widget_keys["Combined_Export"]
+        )
+    else:
+        st.warning(f"No data available for {export_region} in the selected date range.")
 
-        if all_data:
-            combined_df = pd.concat(all_data, ignore_index=True, sort=False)
-            cols = ["Data_Type"] + [c for c in combined_df.columns if c != "Data_Type"]
-            combined_df = combined_df[cols]
 
-            st.download_button(
-                label=f"⬇️ Download {export_region} Combined Export (CSV)",
-                data=combined_df.to_csv(index=False),
-                file_name=f"{export_region}_Combined_Export_{START_DATE}_{END_DATE}.csv",
-                mime="text/csv", key=f"combined_download_{export_region}"
-            )
-            st.success(f"Combined export ready for {export_region}! Total records: {len(combined_df):,}")
-        else:
-            st.warning(f"No data available for {export_region} in the selected date range.")
+with tabs[7]:
+    _render_if_active(7, _render_export)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -983,9 +1013,72 @@ with tabs[7]:
 # ─────────────────────────────────────────────────────────────────────────────
 # TIME RANGE EXPORT tab  (live fetch, custom date range)
 # ─────────────────────────────────────────────────────────────────────────────
-with tabs[8]:
-    st.session_state.active_tab = 8
+class _IncompleteFetch(Exception):
+    # Raised out of _fetch_and_transform so a fetch that hit API errors is never cached;
+    # the partial result rides along for the caller to show
+    def __init__(self, data):
+        super().__init__("API errors during fetch")
+        self.data = data
+
+
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False)
+def _fetch_and_transform(region, start_ms, end_ms):
+    # Theft/fill fetch + post-processing for the Time Range tab, cached per window so
+    # re-fetching the same range (or rerunning after a download) skips the API round trip
+    from data_fetcher import (
+        fetch_batches,
+        safe_parse_variation,
+        ensure_timestamp_consistency,
+        clean_common_filters,
+        build_cev_df,
+        add_usfs_column,
+        GALLON_CONVERSION,
+    )
+
+    errors_before = len(get_api_errors())
+    raw_theft, raw_fill = fetch_batches(start_ms, end_ms, REGIONS[region])
+
+    for df_ref in [raw_theft, raw_fill]:
+        if "probable_variation" in df_ref.columns:
+            df_ref["probable_variation_max"] = df_ref["probable_variation"].apply(safe_parse_variation)
+        else:
+            df_ref["probable_variation_max"] = None
+
+    if region == "NASA":
+        for df_ref in [raw_theft, raw_fill]:
+            if "amount" in df_ref.columns:
+                df_ref["amount"] *= GALLON_CONVERSION
+
+    if region == "FML":
+        if "Amount_kgs" in raw_theft.columns:
+            raw_theft["amount"] = raw_theft["Amount_kgs"]
+        if "Amount_kgs" in raw_fill.columns:
+            raw_fill["amount"]  = raw_fill["Amount_kgs"]
+
+    raw_theft = ensure_timestamp_consistency(raw_theft)
+    raw_fill  = ensure_timestamp_consistency(raw_fill)
+
+    theft_cev_df = build_cev_df(raw_theft)
+    fill_cev_df  = build_cev_df(raw_fill)
 
+    theft_df = clean_common_filters(raw_theft)
+    fill_df  = clean_common_filters(raw_fill)
+
+    theft_df = add_usfs_column(theft_df)
+    fill_df  = add_usfs_column(fill_df)
+
+    data = {
+        "theft":     theft_df,
+        "fill":      fill_df,
+        "theft_cev": theft_cev_df,
+        "fill_cev":  fill_cev_df,
+    }
+    if len(get_api_errors()) > errors_before:
+        raise _IncompleteFetch(data)
+    return data
+
+
+with tabs[8]:
     @st.fragment
     def time_range_export_fragment():
         st.markdown("<h2 style='text-align:center;'>📅 Time Range Export</h2>", unsafe_allow_html=True)
@@ -1061,19 +1154,14 @@ with tabs[8]:
                 date_tag    = f"{tr_start}_{tr_end}"
 
                 from data_fetcher import (
-                    fetch_batches,
                     fetch_low_fuel_batches,
                     fetch_data_loss_batches,
-                    safe_parse_variation,
                     ensure_timestamp_consistency,
                     clean_common_filters,
-                    build_cev_df,
-                    add_usfs_column,
                     build_data_loss_summary,
                     build_daily_df,
                     build_daily_alert_count_df,
                     build_daily_pv_df,
-                    GALLON_CONVERSION,
                     MCE_TYPES,
                 )
 
@@ -1086,36 +1174,13 @@ with tabs[8]:
 
                 if needs_theft_fill:
                     with st.spinner(f"Fetching theft & filling data for {tr_label} …"):
-                        raw_theft, raw_fill = fetch_batches(tr_start_ms, tr_end_ms, tr_url)
-
-                        for df_ref in [raw_theft, raw_fill]:
-                            if "probable_variation" in df_ref.columns:
-                                df_ref["probable_variation_max"] = df_ref["probable_variation"].apply(safe_parse_variation)
-                            else:
-                                df_ref["probable_variation_max"] = None
-
-                        if tr_region == "NASA":
-                            for df_ref in [raw_theft, raw_fill]:
-                                if "amount" in df_ref.columns:
-                                    df_ref["amount"] *= GALLON_CONVERSION
-
-                        if tr_region == "FML":
-                            if "Amount_kgs" in raw_theft.columns:
-                                raw_theft["amount"] = raw_theft["Amount_kgs"]
-                            if "Amount_kgs" in raw_fill.columns:
-                                raw_fill["amount"]  = raw_fill["Amount_kgs"]
-
-                        raw_theft = ensure_timestamp_consistency(raw_theft)
-                        raw_fill  = ensure_timestamp_consistency(raw_fill)
-
-                        theft_cev_df = build_cev_df(raw_theft)
-                        fill_cev_df  = build_cev_df(raw_fill)
-
-                        theft_df = clean_common_filters(raw_theft)
-                        fill_df  = clean_common_filters(raw_fill)
-
-                        theft_df = add_usfs_column(theft_df)
-                        fill_df  = add_usfs_column(fill_df)
+                        try:
+                            tr_data = _fetch_and_transform(tr_region, tr_start_ms, tr_end_ms)
+                        except _IncompleteFetch as exc:
+                            # Not cached — the errors are listed at the bottom of the tab
+                            tr_data = exc.data
+                        theft_df, fill_df = tr_data["theft"], tr_data["fill"]
+                        theft_cev_df, fill_cev_df = tr_data["theft_cev"], tr_data["fill_cev"]
 
                     st.success(
                         f"Fetched: **{len(theft_df):,}** DPL theft  |  "
@@ -1172,7 +1237,7 @@ with tabs[8]:
                     elif plot_type == "low_fuel":
                         daily = build_daily_alert_count_df(raw_df)
                     elif plot_type == "pv":
-                        pv_df = raw_df[~raw_df["probable_variation_max"].isna()].copy() \
+                        pv_df = raw_df.dropna(subset=["probable_variation_max"]) \
                             if "probable_variation_max" in raw_df.columns else pd.DataFrame()
                         daily = build_daily_pv_df(pv_df)
                     else:
@@ -1182,9 +1247,10 @@ with tabs[8]:
                         if plot_type == "low_fuel":
                             fig = create_plot_low_fuel(daily, chart_title)
                         elif plot_type == "pv":
-                            fig = create_plot_pv(daily, chart_title, tr_unit)
+                            fig = _build_line_plot(daily, chart_title, tr_unit, y_col="probable_variation_max",
+                                                   height=420, name="Probable Variation")
                         else:
-                            fig = create_plot(daily, chart_title, tr_unit)
+                            fig = _build_line_plot(daily, chart_title, tr_unit)
                         st.plotly_chart(fig, use_container_width=True)
                     else:
                         st.info(f"No daily data to plot for **{chart_title}**")
@@ -1195,7 +1261,7 @@ with tabs[8]:
                     with dl_col3:
                         st.download_button(
                             label=f"📥 {dl_label}",
-                            data=raw_df.to_csv(index=False),
+                            data=lambda df=raw_df: _csv_bytes(df),
                             file_name=filename,
                             mime="text/csv",
                             key=dl_key
@@ -1250,7 +1316,7 @@ with tabs[8]:
                         with dl_col3:
                             st.download_button(
                                 label="📥 Download Data Loss CSV",
-                                data=data_loss_df.to_csv(index=False),
+                                data=lambda df=data_loss_df: _csv_bytes(df),
                                 file_name=f"{tr_region}_Data_Loss_{date_tag}.csv",
                                 mime="text/csv",
                                 key="tr_dl_data_loss"
@@ -1263,10 +1329,9 @@ with tabs[8]:
                     all_combined = []
 
                     def _tag_and_append(df, label):
+                        # assign() builds the tagged frame in one step — no full copy first
                         if df is not None and not df.empty:
-                            d = df.copy()
-                            d["Data_Type"] = label
-                            all_combined.append(d)
+                            all_combined.append(df.assign(Data_Type=label))
 
                     if cb_theft:      _tag_and_append(theft_df,     "DPL_Theft")
                     if cb_fill:       _tag_and_append(fill_df,      "DPL_Filling")
@@ -1276,12 +1341,16 @@ with tabs[8]:
                     if cb_data_loss:  _tag_and_append(data_loss_df, "Data_Loss")
 
                     if all_combined:
-                        combined_tr = pd.concat(all_combined, ignore_index=True, sort=False)
-                        cols = ["Data_Type"] + [c for c in combined_tr.columns if c != "Data_Type"]
-                        combined_tr = combined_tr[cols]
+                        # Column union worked out once; pre-aligned frames concat without re-indexing
+                        cols = ["Data_Type"] + list(dict.fromkeys(
+                            c for d in all_combined for c in d.columns if c != "Data_Type"
+                        ))
+                        combined_tr = pd.concat(
+                            [d.reindex(columns=cols) for d in all_combined], ignore_index=True
+                        )
                         st.download_button(
                             label=f"⬇️ Download Combined CSV — {len(combined_tr):,} total records",
-                            data=combined_tr.to_csv(index=False),
+                            data=lambda df=combined_tr: _csv_bytes(df),
                             file_name=f"{tr_region}_Combined_{date_tag}.csv",
                             mime="text/csv",
                             key="tr_dl_combined"
@@ -1296,6 +1365,6 @@ with tabs[8]:
                         for err in tr_errors:
                             st.code(err)
 
-    time_range_export_fragment()
+    _render_if_active(8, time_range_export_fragment)
 
 st.caption("© Intangles | Fuel Monitoring Dashboard")
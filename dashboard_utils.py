@@ -1,7 +1,17 @@
 import streamlit as st
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
+import numpy as np
 import base64
+import functools
+import os
+import json
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from streamlit_autorefresh import st_autorefresh
 
 try:
@@ -14,7 +24,7 @@ try:
         build_daily_pv_df,
         build_daily_amount_df,
         add_usfs_column,
-        contains_usfs,
+        usfs_mask,
         prepare_data_loss_table,
         build_data_loss_summary
     )
@@ -22,10 +32,16 @@ except ImportError:
     st.error("Could not import 'data_fetcher.py'.")
     st.stop()
 
+@functools.lru_cache(maxsize=4)
+def _encode_image(image_path, mtime_ns):
+    # mtime_ns is only part of the cache key, so an edited file is re-read
+    with open(image_path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
 def load_image_base64(image_path):
     try:
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
+        return _encode_image(image_path, os.stat(image_path).st_mtime_ns)
     except FileNotFoundError:
         return ""
 
@@ -47,107 +63,329 @@ end_time_ms = int(
 )
 
 
-# ── Load from Drive — cached in session_state so it only runs ONCE per session ──
-@st.cache_resource(show_spinner="Loading data from Google Drive...")
-def load_all_regions():
+# ── Local parquet cache — survives process restarts ─────────
+DISK_CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+DISK_CACHE_MANIFEST = DISK_CACHE_DIR / "manifest.json"
+
+
+def _write_json_atomic(path, obj):
+    """Write JSON to a temp file beside path, then swap it in, so readers never see half a file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _read_disk_cache(versions):
     """
-    Downloads all region data from Google Drive once per session.
-    Uses st.cache_resource so it survives Streamlit reruns (TV rotations).
+    Results for the current window from .cache/, or None if stale/missing.
+
+    versions maps "region/filename" to Drive's modifiedTime; a cache written
+    against different Drive files is stale even inside the same window.
+    None skips that check (Drive unreachable).
     """
+    from drive_cache import restore_list_columns
+
+    try:
+        manifest = json.loads(DISK_CACHE_MANIFEST.read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("window") != [start_time_ms, end_time_ms]:
+        return None
+    if list(manifest.get("regions", {})) != list(REGIONS.keys()):
+        return None
+    if versions is not None and manifest.get("versions") != versions:
+        return None
+    try:
+        return {
+            region: {
+                key: restore_list_columns(
+                    pd.read_parquet(DISK_CACHE_DIR / region / f"{key}.parquet")
+                )
+                for key in keys
+            }
+            for region, keys in manifest["regions"].items()
+        }
+    except Exception as e:
+        print(f"[Cache] Ignoring local parquet cache: {e}")
+        return None
+
+
+def _write_disk_cache(results, versions):
+    """Persist every region's frames as parquet, manifest written last."""
+    DISK_CACHE_MANIFEST.unlink(missing_ok=True)
+    try:
+        for region, data in results.items():
+            region_dir = DISK_CACHE_DIR / region
+            region_dir.mkdir(parents=True, exist_ok=True)
+            for key, df in data.items():
+                df.to_parquet(region_dir / f"{key}.parquet", compression="zstd")
+    except Exception as e:
+        # e.g. mixed-type object columns Arrow can't serialise
+        print(f"[Cache] Could not write local parquet cache: {e}")
+        return
+    try:
+        _write_json_atomic(DISK_CACHE_MANIFEST, {
+            "window":   [start_time_ms, end_time_ms],
+            "regions":  {region: list(data) for region, data in results.items()},
+            "versions": versions,
+        })
+    except OSError as e:
+        print(f"[Cache] Could not write local cache manifest: {e}")
+
+
+def clear_disk_cache():
+    shutil.rmtree(DISK_CACHE_DIR, ignore_errors=True)
+
+
+# Raw Drive files, reused when Drive's modifiedTime hasn't moved.
+# The two layers cover different restarts: the results cache above skips the
+# per-region rebuild too (USFS tagging, daily aggregates) but is keyed on the
+# date window, so it goes stale every day; these shards don't depend on the
+# window, so a moved window still downloads nothing and only rebuilds
+RAW_CACHE_DIR = DISK_CACHE_DIR / "raw"
+RAW_CACHE_MANIFEST = RAW_CACHE_DIR / "manifest.json"
+_raw_manifest_lock = threading.Lock()
+
+
+def _read_raw_manifest():
+    try:
+        return json.loads(RAW_CACHE_MANIFEST.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_raw_manifest(manifest):
+    try:
+        RAW_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(RAW_CACHE_MANIFEST, manifest)
+    except OSError as e:
+        print(f"[Cache] Could not write raw cache manifest: {e}")
+
+
+def _fetch_raw(service, region, stem, root_folder_id, file_ids, manifest):
+    """Local raw shard if Drive's copy is unchanged, else download and store it."""
     from drive_cache import (
-        get_drive_service,
-        get_root_folder_id,
-        download_jsonl,
+        download_frame, get_modified_time, pick_cache_file, restore_list_columns,
     )
 
-    service = get_drive_service()
-    root_folder_id = get_root_folder_id()
+    filename = pick_cache_file(
+        stem, file_ids, lambda name: get_modified_time(file_ids[name])
+    ) if file_ids else None
+    modified = get_modified_time(file_ids[filename]) if filename else None
+    key = f"{region}/{filename}"
+    shard = RAW_CACHE_DIR / region / f"{stem}.parquet"
+
+    with _raw_manifest_lock:
+        unchanged = modified is not None and manifest.get(key) == modified
+    if unchanged and shard.exists():
+        try:
+            df = restore_list_columns(pd.read_parquet(shard))
+            print(f"[Cache] {key} unchanged on Drive, using local copy")
+            return df
+        except Exception as e:
+            print(f"[Cache] Ignoring raw shard {key}: {e}")
+
+    df = download_frame(service, region, stem, root_folder_id, file_ids)
+    if modified is not None:
+        try:
+            shard.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(shard, compression="zstd")
+        except Exception as e:
+            print(f"[Cache] Could not store raw shard {key}: {e}")
+        else:
+            with _raw_manifest_lock:
+                manifest[key] = modified
+    return df
+
+
+# ── Per-region load (runs in a worker thread) ──────────────
+REGION_FILES = {
+    "theft_all":     "theft",
+    "fill_all":      "fill",
+    "low_fuel_all":  "low_fuel",
+    "data_loss_all": "data_loss",
+    "theft_cev_all": "theft_cev",
+    "fill_cev_all":  "fill_cev",
+}
 
-    results = {}
 
-    for region in REGIONS.keys():
-        print(f"[Drive] Loading {region}...")
-
-        # Download raw files from Drive
-        theft_all     = download_jsonl(service, region, "theft.jsonl",     root_folder_id)
-        fill_all      = download_jsonl(service, region, "fill.jsonl",      root_folder_id)
-        low_fuel_all  = download_jsonl(service, region, "low_fuel.jsonl",  root_folder_id)
-        data_loss_all = download_jsonl(service, region, "data_loss.jsonl", root_folder_id)
-        theft_cev_all = download_jsonl(service, region, "theft_cev.jsonl", root_folder_id)
-        fill_cev_all  = download_jsonl(service, region, "fill_cev.jsonl",  root_folder_id)
-
-        # Filter to date range — use fixed values, no closure issue
-        def filter_range(df, s=start_time_ms, e=end_time_ms):
-            if df is not None and not df.empty and "time_ms" in df.columns:
-                return df[(df["time_ms"] >= s) & (df["time_ms"] <= e)].copy()
-            return df if df is not None else pd.DataFrame()
-
-        theft_all     = filter_range(theft_all)
-        fill_all      = filter_range(fill_all)
-        low_fuel_all  = filter_range(low_fuel_all)
-        data_loss_all = filter_range(data_loss_all)
-        theft_cev_all = filter_range(theft_cev_all)
-        fill_cev_all  = filter_range(fill_cev_all)
-
-        # Add usfs column
-        if not theft_all.empty:
-            theft_all = add_usfs_column(theft_all)
-        if not fill_all.empty:
-            fill_all = add_usfs_column(fill_all)
-
-        # PV subsets
-        theft_pv = (
-            theft_all[~theft_all["probable_variation_max"].isna()].copy()
-            if not theft_all.empty and "probable_variation_max" in theft_all.columns
-            else pd.DataFrame()
-        )
-        fill_pv = (
-            fill_all[~fill_all["probable_variation_max"].isna()].copy()
-            if not fill_all.empty and "probable_variation_max" in fill_all.columns
-            else pd.DataFrame()
-        )
+def _load_region(region, service, root_folder_id, file_ids=None, raw_manifest=None):
+    """Download one region's files concurrently and build its results dict."""
+    from drive_cache import find_or_create_folder, list_region_files
 
-        # USFS subsets
-        theft_usfs = (
-            theft_all[theft_all["usfs"].apply(contains_usfs)]
-            if not theft_all.empty and "usfs" in theft_all.columns
-            else pd.DataFrame()
-        )
-        fill_usfs = (
-            fill_all[fill_all["usfs"].apply(contains_usfs)]
-            if not fill_all.empty and "usfs" in fill_all.columns
-            else pd.DataFrame()
+    if raw_manifest is None:
+        raw_manifest = {}
+
+    print(f"[Drive] Loading {region}...")
+
+    # One listing resolves all six file ids for the region (unless prefetched)
+    if file_ids is None:
+        file_ids = list_region_files(
+            service, find_or_create_folder(service, region, root_folder_id)
         )
 
-        results[region] = {
-            "theft_raw":         theft_all,
-            "fill_raw":          fill_all,
-            "low_fuel_raw":      low_fuel_all,
-            "data_loss_raw":     data_loss_all,
-            "theft_cev":         theft_cev_all,
-            "fill_cev":          fill_cev_all,
-            "data_loss_table":   prepare_data_loss_table(data_loss_all, region),
-            "data_loss_summary": build_data_loss_summary(data_loss_all),
-            "theft_daily":       build_daily_df(theft_all),
-            "fill_daily":        build_daily_df(fill_all),
-            "low_fuel_daily":    build_daily_alert_count_df(low_fuel_all),
-            "theft_cev_daily":   build_daily_df(theft_cev_all),
-            "fill_cev_daily":    build_daily_df(fill_cev_all),
-            "theft_pv_daily":    build_daily_pv_df(theft_pv),
-            "fill_pv_daily":     build_daily_pv_df(fill_pv),
-            "theft_usfs_daily":  build_daily_amount_df(theft_usfs),
-            "fill_usfs_daily":   build_daily_amount_df(fill_usfs),
+    # Download raw files from Drive, or reuse local shards Drive hasn't changed.
+    # Each worker thread gets its own AuthorizedHttp inside drive_cache, so
+    # sharing `service` is safe
+    with ThreadPoolExecutor(max_workers=len(REGION_FILES)) as ex:
+        futures = {
+            name: ex.submit(
+                _fetch_raw, service, region, stem, root_folder_id,
+                file_ids, raw_manifest,
+            )
+            for name, stem in REGION_FILES.items()
         }
+        raw = {name: fut.result() for name, fut in futures.items()}
+
+    # Filter to date range — use fixed values, no closure issue
+    def filter_range(df, s=start_time_ms, e=end_time_ms):
+        if df is not None and not df.empty and "time_ms" in df.columns:
+            tm = df["time_ms"].to_numpy()
+            if df["time_ms"].is_monotonic_increasing:
+                # Sorted: two binary searches, no boolean mask
+                lo = tm.searchsorted(s, side="left")
+                hi = tm.searchsorted(e, side="right")
+                return df.iloc[lo:hi].copy()
+            return df[(tm >= s) & (tm <= e)].copy()
+        return df if df is not None else pd.DataFrame()
+
+    theft_all     = filter_range(raw["theft_all"])
+    fill_all      = filter_range(raw["fill_all"])
+    low_fuel_all  = filter_range(raw["low_fuel_all"])
+    data_loss_all = filter_range(raw["data_loss_all"])
+    theft_cev_all = filter_range(raw["theft_cev_all"])
+    fill_cev_all  = filter_range(raw["fill_cev_all"])
+
+    # Add usfs column
+    if not theft_all.empty:
+        theft_all = add_usfs_column(theft_all)
+    if not fill_all.empty:
+        fill_all = add_usfs_column(fill_all)
+
+    # PV subsets
+    theft_pv = (
+        theft_all.dropna(subset=["probable_variation_max"])
+        if not theft_all.empty and "probable_variation_max" in theft_all.columns
+        else pd.DataFrame()
+    )
+    fill_pv = (
+        fill_all.dropna(subset=["probable_variation_max"])
+        if not fill_all.empty and "probable_variation_max" in fill_all.columns
+        else pd.DataFrame()
+    )
 
-        print(
-            f"✅ {region} — "
-            f"theft:{len(theft_all)} fill:{len(fill_all)} "
-            f"low_fuel:{len(low_fuel_all)}"
-        )
+    # USFS subsets
+    theft_usfs = (
+        theft_all[usfs_mask(theft_all["usfs"])]
+        if not theft_all.empty and "usfs" in theft_all.columns
+        else pd.DataFrame()
+    )
+    fill_usfs = (
+        fill_all[usfs_mask(fill_all["usfs"])]
+        if not fill_all.empty and "usfs" in fill_all.columns
+        else pd.DataFrame()
+    )
+
+    results = {
+        "theft_raw":         theft_all,
+        "fill_raw":          fill_all,
+        "low_fuel_raw":      low_fuel_all,
+        "data_loss_raw":     data_loss_all,
+        "theft_cev":         theft_cev_all,
+        "fill_cev":          fill_cev_all,
+        "data_loss_table":   prepare_data_loss_table(data_loss_all, region),
+        "data_loss_summary": build_data_loss_summary(data_loss_all),
+        "theft_daily":       build_daily_df(theft_all),
+        "fill_daily":        build_daily_df(fill_all),
+        "low_fuel_daily":    build_daily_alert_count_df(low_fuel_all),
+        "theft_cev_daily":   build_daily_df(theft_cev_all),
+        "fill_cev_daily":    build_daily_df(fill_cev_all),
+        "theft_pv_daily":    build_daily_pv_df(theft_pv),
+        "fill_pv_daily":     build_daily_pv_df(fill_pv),
+        "theft_usfs_daily":  build_daily_amount_df(theft_usfs),
+        "fill_usfs_daily":   build_daily_amount_df(fill_usfs),
+    }
+
+    # Plot builders read "time" as datetime64 — convert once here, not per render
+    for key, df in results.items():
+        if key.endswith("_daily") and "time" in df.columns \
+                and not pd.api.types.is_datetime64_any_dtype(df["time"]):
+            df["time"] = pd.to_datetime(df["time"], errors="coerce")
+
+    print(
+        f"✅ {region} — "
+        f"theft:{len(theft_all)} fill:{len(fill_all)} "
+        f"low_fuel:{len(low_fuel_all)}"
+    )
 
     return results
 
 
+# ── Load from Drive — cached in session_state so it only runs ONCE per session ──
+@st.cache_resource(show_spinner="Loading data from Google Drive...")
+def load_all_regions():
+    """
+    Downloads all region data from Google Drive once per session.
+    Uses st.cache_resource so it survives Streamlit reruns (TV rotations).
+    Regions (and the files within each region) are fetched concurrently,
+    and the result is mirrored to .cache/ so a restart within the same
+    date window only lists Drive, and downloads nothing unless a file changed.
+    """
+    from drive_cache import (
+        get_drive_service, get_root_folder_id, get_modified_time, prefetch_region_files,
+    )
+
+    try:
+        service = get_drive_service()
+        root_folder_id = get_root_folder_id()
+        # Folder + file id lookups for every region in two batched HTTP calls;
+        # media downloads can't be batched, so those stay per-file below
+        region_files = prefetch_region_files(service, REGIONS.keys(), root_folder_id)
+    except Exception as e:
+        cached = _read_disk_cache(versions=None)
+        if cached is None:
+            raise
+        print(f"[Cache] Drive unreachable ({e}), using local parquet cache as is")
+        return cached
+
+    # The listing carries every file's modifiedTime — the local cache is only
+    # reused if it was built from exactly these Drive files
+    versions = {
+        f"{region}/{name}": get_modified_time(file_id)
+        for region, file_ids in sorted(region_files.items())
+        for name, file_id in sorted(file_ids.items())
+    }
+    cached = _read_disk_cache(versions)
+    if cached is not None:
+        print("[Cache] Loaded all regions from local parquet cache")
+        return cached
+
+    raw_manifest = _read_raw_manifest()
+
+    loaded = {}
+    with ThreadPoolExecutor(max_workers=len(REGIONS)) as ex:
+        futures = {
+            ex.submit(
+                _load_region, region, service, root_folder_id,
+                region_files.get(region), raw_manifest,
+            ): region
+            for region in REGIONS.keys()
+        }
+        for fut in as_completed(futures):
+            loaded[futures[fut]] = fut.result()
+    _write_raw_manifest(raw_manifest)
+
+    # Keep REGIONS order regardless of completion order
+    results = {region: loaded[region] for region in REGIONS.keys()}
+    _write_disk_cache(results, versions)
+    return results
+
+
 def refresh_data():
     """Clears cache AND resets checkpoint to window start so missing days are re-fetched."""
     from drive_cache import get_drive_service, get_root_folder_id, upload_checkpoint
@@ -164,207 +402,149 @@ def refresh_data():
     for region in REGIONS.keys():
         upload_checkpoint(service, region, window_start_ms, root_folder_id)
     
+    clear_disk_cache()
     st.cache_resource.clear()
     st.rerun()
 
 
 # ── Plot functions ───────────────────────────────────────────
 
-def create_plot(df, title, unit):
-    fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+# Traces longer than this are reduced with LTTB before plotting
+LTTB_THRESHOLD = 2000
 
-    fig.add_trace(go.Scattergl(
-        x=df["time"], y=df["amount"],
-        mode="markers+lines", name="Amount",
-        line=dict(width=4.5), marker=dict(size=9)
-    ))
+# SVG scatter is cheaper than WebGL for short traces (and holds no GL context)
+SCATTERGL_MIN_POINTS = 1000
 
-    if "moving average" in df.columns:
-        fig.add_trace(go.Scattergl(
-            x=df["time"], y=df["moving average"],
-            mode="lines", name="Moving Avg",
-            line=dict(dash="dot", color="green", width=4.5)
-        ))
+# Above this many points the series is drawn as a bare line (no markers)
+MARKERS_MAX_POINTS = 100
 
-    total = df["amount"].sum()
-    avg = total / len(df) if len(df) else 0
-    y_max = max(
-        df["amount"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
-    ) * 1.3
 
-    fig.update_layout(
-        title={"text": (
-            f"<b style='font-size:30px'>{title}</b><br><br>"
-            f"<span style='font-size:26px'>Total: {total:.2f} | Avg/Day: {avg:.2f}</span>"
-        ), "x": 0.5, "xanchor": "center"},
-        xaxis_title="Date", yaxis_title=unit,
-        xaxis=dict(
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray',
-            tickmode='linear', dtick=86400000,
-            tickformat='%b %d\n%Y', tickangle=-45
-        ),
-        yaxis=dict(
-            range=[0, y_max],
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray'
-        ),
-        height=450, margin=dict(t=100, b=40, l=60, r=60),
-        showlegend=False
-    )
-    return fig
+def _lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: row positions of the n_out kept points."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
 
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
 
-def create_plot_usfs(df, title, unit):
-    fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:nxt_hi].mean()
+        avg_y = y[hi:nxt_hi].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
 
-    fig.add_trace(go.Scattergl(
-        x=df["time"], y=df["amount"],
-        mode="markers+lines", name="Amount",
-        line=dict(width=4.5), marker=dict(size=9)
-    ))
 
-    if "moving average" in df.columns:
-        fig.add_trace(go.Scattergl(
-            x=df["time"], y=df["moving average"],
-            mode="lines", name="Moving Avg",
-            line=dict(dash="dot", color="green", width=4.5)
-        ))
+def _downsample(df, y_col, n_out=LTTB_THRESHOLD):
+    """Rows of df picked by LTTB on (time, y_col); unchanged below the threshold."""
+    if len(df) <= n_out:
+        return df
+    x = df["time"].to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    y = np.nan_to_num(df[y_col].to_numpy(dtype=np.float64))
+    return df.iloc[_lttb_indices(x, y, n_out)]
 
-    total = df["amount"].sum()
-    avg = total / len(df) if len(df) else 0
-    y_max = max(
-        df["amount"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
-    ) * 1.3
 
-    fig.update_layout(
-        title={"text": (
-            f"<b style='font-size:30px'>{title}</b><br><br>"
-            f"<span style='font-size:26px'>Total: {total:.2f} | Avg/Day: {avg:.2f}</span>"
-        ), "x": 0.5, "xanchor": "center"},
-        xaxis_title="Date", yaxis_title=unit,
-        xaxis=dict(
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray',
-            tickmode='linear', dtick=86400000,
-            tickformat='%b %d\n%Y', tickangle=-45
-        ),
-        yaxis=dict(
-            range=[0, y_max],
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray'
-        ),
-        height=420, margin=dict(t=100, b=40, l=60, r=60),
-        showlegend=False
-    )
-    return fig
+def _scatter_cls(n_points):
+    return go.Scattergl if n_points > SCATTERGL_MIN_POINTS else go.Scatter
 
 
-def create_plot_low_fuel(df, title):
-    fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+def _as_list(series, dtype="float64"):
+    """Plain Python list so plotly skips its typed-array validation pass."""
+    return series.to_numpy(dtype=dtype).tolist()
 
-    fig.add_trace(go.Scattergl(
-        x=df["time"], y=df["vehicle_id"],
-        mode="markers+lines", name="Alert Count",
-        line=dict(width=3.5), marker=dict(size=9)
+
+# Static chart styling, registered once as a plotly template; figures only
+# set what varies (title, axis titles, y-range, height)
+_AXIS_FONT = dict(
+    title_font=dict(size=26, color='black', family='Arial Black'),
+    tickfont=dict(size=17, color='black', family='Arial Black'),
+    showgrid=True, gridcolor='lightgray',
+)
+pio.templates["fuel"] = go.layout.Template(layout=go.Layout(
+    xaxis=dict(
+        _AXIS_FONT,
+        tickmode='linear', dtick=86400000,
+        tickformat='%b %d\n%Y', tickangle=-45,
+    ),
+    yaxis=_AXIS_FONT,
+    title=dict(x=0.5, xanchor="center"),
+    height=420, margin=dict(t=100, b=40, l=60, r=60),
+    showlegend=False,
+))
+# Layered on the default so colours/backgrounds are unchanged
+_FIG_TEMPLATE = f"{pio.templates.default}+fuel"
+
+
+def _build_plot(df, *, ycol, title, unit, height=420, ma_color="green",
+                series_name="Amount", line_width=4.5, ma_width=4.5,
+                always_markers=False):
+    # df is read-only here; "time" is already datetime64 (see _load_region)
+    fig = go.Figure()
+    plot_df = _downsample(df, ycol)
+    x = _as_list(plot_df["time"], "datetime64[ms]")
+    scatter = _scatter_cls(len(plot_df))
+    has_ma = "moving average" in df.columns
+    dense = len(plot_df) > MARKERS_MAX_POINTS and not always_markers
+
+    fig.add_trace(scatter(
+        x=x, y=_as_list(plot_df[ycol]),
+        mode="lines" if dense else "markers+lines", name=series_name,
+        line=dict(width=line_width), marker=dict(size=9)
     ))
 
-    if "moving average" in df.columns:
-        fig.add_trace(go.Scattergl(
-            x=df["time"], y=df["moving average"],
+    if has_ma:
+        fig.add_trace(scatter(
+            x=x, y=_as_list(plot_df["moving average"]),
             mode="lines", name="Moving Avg",
-            line=dict(dash="dot", color="red", width=5.5)
+            line=dict(dash="dot", color=ma_color, width=ma_width)
         ))
 
-    total = df["vehicle_id"].sum()
+    total = df[ycol].sum()
     avg = total / len(df) if len(df) else 0
     y_max = max(
-        df["vehicle_id"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
+        df[ycol].max(),
+        df["moving average"].max() if has_ma else 0
     ) * 1.3
 
     fig.update_layout(
-        title={"text": (
+        template=_FIG_TEMPLATE,
+        title_text=(
             f"<b style='font-size:30px'>{title}</b><br><br>"
             f"<span style='font-size:26px'>Total: {total:.2f} | Avg/Day: {avg:.2f}</span>"
-        ), "x": 0.5, "xanchor": "center"},
-        xaxis_title="Date", yaxis_title="Alert Count",
-        xaxis=dict(
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray',
-            tickmode='linear', dtick=86400000,
-            tickformat='%b %d\n%Y', tickangle=-45
-        ),
-        yaxis=dict(
-            range=[0, y_max],
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray'
         ),
-        height=420, margin=dict(t=100, b=40, l=60, r=60),
-        showlegend=False
+        xaxis_title="Date", yaxis_title=unit,
+        yaxis_range=[0, y_max],
+        height=height,
     )
     return fig
 
 
-def create_plot_pv(df, title, unit):
-    fig = go.Figure()
-    df = df.copy()
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+def create_plot(df, title, unit):
+    return _build_plot(df, ycol="amount", title=title, unit=unit, height=450)
 
-    fig.add_trace(go.Scattergl(
-        x=df["time"], y=df["probable_variation_max"],
-        mode="markers+lines", name="Probable Variation",
-        line=dict(width=4.5), marker=dict(size=9)
-    ))
 
-    if "moving average" in df.columns:
-        fig.add_trace(go.Scattergl(
-            x=df["time"], y=df["moving average"],
-            mode="lines", name="Moving Avg",
-            line=dict(dash="dot", color="green", width=4.5)
-        ))
+def create_plot_usfs(df, title, unit):
+    return _build_plot(df, ycol="amount", title=title, unit=unit, always_markers=True)
 
-    total = df["probable_variation_max"].sum()
-    avg = total / len(df) if len(df) else 0
-    y_max = max(
-        df["probable_variation_max"].max(),
-        df["moving average"].max() if "moving average" in df.columns else 0
-    ) * 1.3
 
-    fig.update_layout(
-        title={"text": (
-            f"<b style='font-size:30px'>{title}</b><br><br>"
-            f"<span style='font-size:26px'>Total: {total:.2f} | Avg/Day: {avg:.2f}</span>"
-        ), "x": 0.5, "xanchor": "center"},
-        xaxis_title="Date", yaxis_title=unit,
-        xaxis=dict(
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray',
-            tickmode='linear', dtick=86400000,
-            tickformat='%b %d\n%Y', tickangle=-45
-        ),
-        yaxis=dict(
-            range=[0, y_max],
-            title_font=dict(size=26, color='black', family='Arial Black'),
-            tickfont=dict(size=17, color='black', family='Arial Black'),
-            showgrid=True, gridcolor='lightgray'
-        ),
-        height=420, margin=dict(t=100, b=40, l=60, r=60),
-        showlegend=False
+def create_plot_low_fuel(df, title):
+    return _build_plot(
+        df, ycol="vehicle_id", title=title, unit="Alert Count",
+        ma_color="red", series_name="Alert Count", line_width=3.5, ma_width=5.5,
+    )
+
+
+def create_plot_pv(df, title, unit):
+    return _build_plot(
+        df, ycol="probable_variation_max", title=title, unit=unit,
+        series_name="Probable Variation", always_markers=True,
     )
-    return fig
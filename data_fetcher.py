@@ -62,6 +62,20 @@ EXCLUDED_MODELS = [
     "2523C 6x4 transit mixer  BS3 pto"
 ]
 
+def _slice_window(df, start_ms, end_ms):
+    # Read-only slice, no copy: every daily/summary builder below copies its input
+    t = df['time_ms']
+    if t.is_monotonic_increasing:
+        # merge_and_deduplicate stores frames sorted by time_ms: two binary searches
+        # and a positional slice instead of a full-length mask
+        tm = t.to_numpy()
+        lo = tm.searchsorted(start_ms, side="left")
+        hi = tm.searchsorted(end_ms, side="right")
+        return df if lo == 0 and hi == len(df) else df.iloc[lo:hi]
+    if start_ms <= t.min() and end_ms >= t.max():
+        return df
+    return df.loc[t.between(start_ms, end_ms, inclusive="both")]
+
 def run_region_cached_with_range(region, url, start_ms, end_ms):
 
     all_data = run_region_cached(region, url)
@@ -74,10 +88,7 @@ def run_region_cached_with_range(region, url, start_ms, end_ms):
             filtered_data[key] = df
             continue
         if isinstance(df, pd.DataFrame) and 'time_ms' in df.columns:
-            filtered_data[key] = df[
-                (df['time_ms'] >= start_ms) & 
-                (df['time_ms'] <= end_ms)
-            ].copy()
+            filtered_data[key] = _slice_window(df, start_ms, end_ms)
             if key == "theft_daily":
                 filtered_data[key] = build_daily_df(filtered_data["theft_raw"])
             elif key == "fill_daily":
@@ -92,22 +103,22 @@ def run_region_cached_with_range(region, url, start_ms, end_ms):
                 filtered_data[key] = build_daily_alert_count_df(filtered_data["low_fuel_raw"])
             elif key == "theft_usfs_daily":
                 usfs_theft = filtered_data["theft_raw"][
-                    filtered_data["theft_raw"]["usfs"].apply(contains_usfs)
+                    usfs_mask(filtered_data["theft_raw"]["usfs"])
                 ] if "usfs" in filtered_data["theft_raw"].columns else pd.DataFrame()
                 filtered_data[key] = build_daily_amount_df(usfs_theft)
             elif key == "fill_usfs_daily":
                 usfs_fill = filtered_data["fill_raw"][
-                    filtered_data["fill_raw"]["usfs"].apply(contains_usfs)
+                    usfs_mask(filtered_data["fill_raw"]["usfs"])
                 ] if "usfs" in filtered_data["fill_raw"].columns else pd.DataFrame()
                 filtered_data[key] = build_daily_amount_df(usfs_fill)
             elif key == "theft_pv_daily":
                 filtered_data[key] = build_daily_pv_df(
-                    filtered_data["theft_raw"][~filtered_data["theft_raw"]["probable_variation_max"].isna()]
+                    filtered_data["theft_raw"].dropna(subset=["probable_variation_max"])
                     if "probable_variation_max" in filtered_data["theft_raw"].columns else pd.DataFrame()
                 )
             elif key == "fill_pv_daily":
                 filtered_data[key] = build_daily_pv_df(
-                    filtered_data["fill_raw"][~filtered_data["fill_raw"]["probable_variation_max"].isna()]
+                    filtered_data["fill_raw"].dropna(subset=["probable_variation_max"])
                     if "probable_variation_max" in filtered_data["fill_raw"].columns else pd.DataFrame()
                 )
             elif key == "data_loss_summary":
@@ -458,6 +469,12 @@ def contains_usfs(x):
     return x in ["usfs", "cusfs"]
 
 
+def usfs_mask(series):
+    # Vectorised contains_usfs over a whole column → positional bool array
+    exploded = series.reset_index(drop=True).explode()
+    return exploded.isin(["usfs", "cusfs"]).groupby(level=0).any().to_numpy(dtype=bool)
+
+
 def build_daily_amount_df(df):
     if df is None or df.empty:
         return pd.DataFrame(columns=["time", "amount", "moving average"])
@@ -762,14 +779,14 @@ def run_region(region, url, start_ms, end_ms):
     low_fuel_df = ensure_time_columns(low_fuel_df)
     low_fuel_df = clean_common_filters(low_fuel_df)
 
-    theft_df_pv = theft_df[~theft_df["probable_variation_max"].isna()].copy()
-    fill_df_pv = fill_df[~fill_df["probable_variation_max"].isna()].copy()
+    theft_df_pv = theft_df.dropna(subset=["probable_variation_max"])
+    fill_df_pv = fill_df.dropna(subset=["probable_variation_max"])
 
     theft_df_usfs = add_usfs_column(theft_df)
     fill_df_usfs = add_usfs_column(fill_df)
 
-    theft_df_usfs = theft_df_usfs[theft_df_usfs["usfs"].apply(contains_usfs)].copy()
-    fill_df_usfs = fill_df_usfs[fill_df_usfs["usfs"].apply(contains_usfs)].copy()
+    theft_df_usfs = theft_df_usfs[usfs_mask(theft_df_usfs["usfs"])].copy()
+    fill_df_usfs = fill_df_usfs[usfs_mask(fill_df_usfs["usfs"])].copy()
 
     return {
         "theft_raw": theft_df,
@@ -801,8 +818,9 @@ def run_region(region, url, start_ms, end_ms):
 def run_region_cached(region, url):
     from drive_cache import (
         get_drive_service, get_root_folder_id,
-        download_jsonl, upload_jsonl,
-        download_checkpoint, upload_checkpoint
+        download_frame, upload_frame,
+        download_checkpoint, upload_checkpoint,
+        find_or_create_folder, list_region_files
     )
 
     service = get_drive_service()
@@ -815,14 +833,17 @@ def run_region_cached(region, url):
     window_start_ms = int(window_start.timestamp() * 1000)
 
     # ── Download existing cache from Drive ──
-    theft_all     = download_jsonl(service, region, "theft.jsonl",     root_folder_id)
-    fill_all      = download_jsonl(service, region, "fill.jsonl",      root_folder_id)
-    low_fuel_all  = download_jsonl(service, region, "low_fuel.jsonl",  root_folder_id)
-    data_loss_all = download_jsonl(service, region, "data_loss.jsonl", root_folder_id)
-    theft_cev_all = download_jsonl(service, region, "theft_cev.jsonl", root_folder_id)
-    fill_cev_all  = download_jsonl(service, region, "fill_cev.jsonl",  root_folder_id)
+    file_ids = list_region_files(
+        service, find_or_create_folder(service, region, root_folder_id)
+    )
+    theft_all     = download_frame(service, region, "theft",     root_folder_id, file_ids)
+    fill_all      = download_frame(service, region, "fill",      root_folder_id, file_ids)
+    low_fuel_all  = download_frame(service, region, "low_fuel",  root_folder_id, file_ids)
+    data_loss_all = download_frame(service, region, "data_loss", root_folder_id, file_ids)
+    theft_cev_all = download_frame(service, region, "theft_cev", root_folder_id, file_ids)
+    fill_cev_all  = download_frame(service, region, "fill_cev",  root_folder_id, file_ids)
 
-    last_fetched_ms = download_checkpoint(service, region, root_folder_id)
+    last_fetched_ms = download_checkpoint(service, region, root_folder_id, file_ids)
 
     # ── Determine what date range to fetch ──
     fetch_start_ms = (
@@ -887,12 +908,12 @@ def run_region_cached(region, url):
 
     # ── Upload updated cache back to Drive ──
     if fetch_start_ms < now_ms:
-        upload_jsonl(service, theft_all,     region, "theft.jsonl",     root_folder_id)
-        upload_jsonl(service, fill_all,      region, "fill.jsonl",      root_folder_id)
-        upload_jsonl(service, low_fuel_all,  region, "low_fuel.jsonl",  root_folder_id)
-        upload_jsonl(service, data_loss_all, region, "data_loss.jsonl", root_folder_id)
-        upload_jsonl(service, theft_cev_all, region, "theft_cev.jsonl", root_folder_id)
-        upload_jsonl(service, fill_cev_all,  region, "fill_cev.jsonl",  root_folder_id)
+        upload_frame(service, theft_all,     region, "theft",     root_folder_id, file_ids)
+        upload_frame(service, fill_all,      region, "fill",      root_folder_id, file_ids)
+        upload_frame(service, low_fuel_all,  region, "low_fuel",  root_folder_id, file_ids)
+        upload_frame(service, data_loss_all, region, "data_loss", root_folder_id, file_ids)
+        upload_frame(service, theft_cev_all, region, "theft_cev", root_folder_id, file_ids)
+        upload_frame(service, fill_cev_all,  region, "fill_cev",  root_folder_id, file_ids)
         upload_checkpoint(service, region, now_ms, root_folder_id)
 
     # ── Add usfs column ──
@@ -901,11 +922,11 @@ def run_region_cached(region, url):
 
     # ── Build derived dataframes ──
     theft_all_pv = (
-        theft_all[~theft_all["probable_variation_max"].isna()].copy()
+        theft_all.dropna(subset=["probable_variation_max"])
         if "probable_variation_max" in theft_all.columns else pd.DataFrame()
     )
     fill_all_pv = (
-        fill_all[~fill_all["probable_variation_max"].isna()].copy()
+        fill_all.dropna(subset=["probable_variation_max"])
         if "probable_variation_max" in fill_all.columns else pd.DataFrame()
     )
 
@@ -924,12 +945,12 @@ def run_region_cached(region, url):
         "theft_cev_daily": build_daily_df(theft_cev_all),
         "fill_cev_daily":  build_daily_df(fill_cev_all),
         "theft_usfs_daily": build_daily_amount_df(
-            theft_all[theft_all["usfs"].apply(contains_usfs)]
+            theft_all[usfs_mask(theft_all["usfs"])]
             if "usfs" in theft_all.columns and not theft_all.empty
             else pd.DataFrame()
         ),
         "fill_usfs_daily": build_daily_amount_df(
-            fill_all[fill_all["usfs"].apply(contains_usfs)]
+            fill_all[usfs_mask(fill_all["usfs"])]
             if "usfs" in fill_all.columns and not fill_all.empty
             else pd.DataFrame()
         ),
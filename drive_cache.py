@@ -1,35 +1,142 @@
 import io
 import json
+import tempfile
+import threading
+import weakref
+import httplib2
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
 import streamlit as st
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+# Socket timeout for every Drive connection (httplib2's default is none)
+HTTP_TIMEOUT_S = 60
+
+# execute() retries 429/5xx this many times with exponential backoff
+WRITE_RETRIES = 5
+
+# Result key → cached file stem in each region folder ({stem}.parquet,
+# or {stem}.jsonl for caches written before the parquet switch)
+CACHE_FILES = {
+    "theft_raw":     "theft",
+    "fill_raw":      "fill",
+    "low_fuel_raw":  "low_fuel",
+    "data_loss_raw": "data_loss",
+    "theft_cev":     "theft_cev",
+    "fill_cev":      "fill_cev",
+}
+
+_thread_local = threading.local()
+
+# Drive service → the credentials it was built with, for per-thread Http objects
+_SERVICE_CREDS = weakref.WeakKeyDictionary()
+
+# (name, parent_id) → Drive id, shared across threads for the process lifetime
+_FOLDER_CACHE: dict[tuple[str, str], str] = {}
+_FILE_CACHE: dict[tuple[str, str], str] = {}
+_ID_CACHE_LOCK = threading.Lock()
+
+# Drive file id → modifiedTime / size in bytes, recorded by the folder listings below
+_FILE_META: dict[str, str] = {}
+_FILE_SIZE: dict[str, int] = {}
+
+# Listing fields for region folder children
+_CHILD_FIELDS = "files(id, name, modifiedTime, size)"
+
+def build_drive_service(creds):
+    """
+    Drive v3 client on a keep-alive AuthorizedHttp, with creds registered
+    so _thread_http can give worker threads their own connection.
+
+    The transport stays HTTP/1.1: googleapiclient only speaks httplib2,
+    which has no HTTP/2 support, so reuse comes from keep-alive instead.
+    """
+    # One keep-alive connection pool for the main thread; workers get their
+    # own via _thread_http. Skip the discovery-doc file cache lookup.
+    http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT_S))
+    service = build("drive", "v3", http=http, cache_discovery=False)
+    _SERVICE_CREDS[service] = creds
+    return service
+
 @st.cache_resource
 def get_drive_service():
     creds_dict = dict(st.secrets["google_service_account"])
     creds = service_account.Credentials.from_service_account_info(
         creds_dict, scopes=SCOPES
     )
-    return build("drive", "v3", credentials=creds)
+    return build_drive_service(creds)
 
 def get_root_folder_id():
     return st.secrets["DRIVE_FOLDER_ID"]
 
+def _thread_http(service):
+    """Authorized Http for the calling thread (httplib2 is not thread-safe)."""
+    creds = _SERVICE_CREDS.get(service)
+    if creds is None:
+        raise ValueError("Drive service was not created with build_drive_service()")
+    http = getattr(_thread_local, "http", None)
+    if http is None or http.credentials is not creds:
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT_S))
+        _thread_local.http = http
+    return http
+
+# Downloads up to this size (per the folder listing) stay in RAM, larger or
+# unlisted ones go to a temp file
+IN_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+
+def _download_media(service, file_id):
+    """Download a Drive file into a rewound BytesIO, or a temp file if it's large."""
+    with _ID_CACHE_LOCK:
+        size = _FILE_SIZE.get(file_id)
+    # Both are full IOBase objects; SpooledTemporaryFile lacks readable()/seekable()
+    # before Python 3.11, which pandas and pyarrow rely on
+    if size is not None and size <= IN_MEMORY_MAX_BYTES:
+        buffer = io.BytesIO()
+    else:
+        buffer = tempfile.TemporaryFile(mode="w+b")
+    request = service.files().get_media(fileId=file_id)
+    request.http = _thread_http(service)
+    downloader = MediaIoBaseDownload(buffer, request, chunksize=DOWNLOAD_CHUNK_BYTES)
+    
+    done = False
+    while not done:
+        _, done = downloader.next_chunk()
+    
+    buffer.seek(0)
+    return buffer
+
 def find_or_create_folder(service, folder_name, parent_id):
     """Find a subfolder by name under parent, create if missing."""
+    with _ID_CACHE_LOCK:
+        cached = _FOLDER_CACHE.get((folder_name, parent_id))
+    if cached:
+        return cached
+
     query = (
         f"name='{folder_name}' and '{parent_id}' in parents "
         f"and mimeType='application/vnd.google-apps.folder' "
         f"and trashed=false"
     )
-    results = service.files().list(q=query, fields="files(id, name)").execute()
+    results = service.files().list(q=query, fields="files(id, name)").execute(http=_thread_http(service))
     files = results.get("files", [])
     
     if files:
+        with _ID_CACHE_LOCK:
+            _FOLDER_CACHE[(folder_name, parent_id)] = files[0]["id"]
         return files[0]["id"]
     
     # Create the subfolder
@@ -38,117 +145,503 @@ def find_or_create_folder(service, folder_name, parent_id):
         "mimeType": "application/vnd.google-apps.folder",
         "parents": [parent_id]
     }
-    folder = service.files().create(body=metadata, fields="id").execute()
+    folder = service.files().create(body=metadata, fields="id").execute(http=_thread_http(service))
+    with _ID_CACHE_LOCK:
+        _FOLDER_CACHE[(folder_name, parent_id)] = folder["id"]
     return folder["id"]
 
 def find_file_id(service, filename, folder_id):
     """Find a file in a specific Drive folder."""
+    with _ID_CACHE_LOCK:
+        cached = _FILE_CACHE.get((filename, folder_id))
+    if cached:
+        return cached
+
     query = (
         f"name='{filename}' and '{folder_id}' in parents "
         f"and trashed=false"
     )
-    results = service.files().list(q=query, fields="files(id, name)").execute()
+    results = service.files().list(q=query, fields="files(id, name)").execute(http=_thread_http(service))
     files = results.get("files", [])
-    return files[0]["id"] if files else None
+    if not files:
+        return None  # misses aren't cached; the file may be created later
+
+    with _ID_CACHE_LOCK:
+        _FILE_CACHE[(filename, folder_id)] = files[0]["id"]
+    return files[0]["id"]
+
+def _remember_file(filename, folder_id, file_id):
+    """Replace any cached id for a file that was just (re)created."""
+    with _ID_CACHE_LOCK:
+        _FILE_CACHE[(filename, folder_id)] = file_id
+
+def _forget_ids(region, filename, root_folder_id):
+    """Drop the cached region folder id and the file id under it."""
+    with _ID_CACHE_LOCK:
+        folder_id = _FOLDER_CACHE.pop((region, root_folder_id), None)
+        if folder_id is not None:
+            _FILE_CACHE.pop((filename, folder_id), None)
+
+def _retry_if_stale(attempt, file_ids, region, filename, root_folder_id):
+    """
+    Run attempt(file_ids); on a 404 the folder or file was deleted or
+    replaced since its id was cached, so forget the ids and run it once
+    more with fresh lookups.
+    """
+    try:
+        return attempt(file_ids)
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+        print(f"[Drive] Stale id for {region}/{filename}, looking it up again")
+        _forget_ids(region, filename, root_folder_id)
+        return attempt(None)
+
+def list_region_files(service, region_folder_id):
+    """Name → id for every file in a region folder, in one list call."""
+    files = _list_files(
+        service,
+        f"'{region_folder_id}' in parents and trashed=false",
+        fields=_CHILD_FIELDS,
+    )
+    return _remember_children(files, region_folder_id)
+
+def _remember_children(files, folder_id):
+    """Record a folder listing in the id/meta caches → {name: id}."""
+    file_ids = {}
+    with _ID_CACHE_LOCK:
+        for f in files:
+            if f["name"] in file_ids:
+                continue
+            file_ids[f["name"]] = f["id"]
+            _FILE_CACHE[(f["name"], folder_id)] = f["id"]
+            if "modifiedTime" in f:
+                _FILE_META[f["id"]] = f["modifiedTime"]
+            if "size" in f:
+                _FILE_SIZE[f["id"]] = int(f["size"])
+    return file_ids
+
+def get_modified_time(file_id):
+    """Drive modifiedTime for a file seen in a folder listing, else None."""
+    with _ID_CACHE_LOCK:
+        return _FILE_META.get(file_id)
 
-def download_jsonl(service, region, filename, root_folder_id):
+def _batch_list(service, queries, fields="files(id, name)"):
+    """
+    Run several files().list queries in one HTTP batch → {key: files}.
+
+    Only first pages come back in the batch; queries with more results
+    continue from their nextPageToken through _list_files.
+    """
+    found, errors, next_pages = {}, {}, {}
+
+    def _store(request_id, response, exception):
+        if exception is not None:
+            errors[request_id] = exception
+            return
+        found[request_id] = response.get("files", [])
+        if response.get("nextPageToken"):
+            next_pages[request_id] = response["nextPageToken"]
+
+    batch = service.new_batch_http_request(callback=_store)
+    for key, query in queries.items():
+        batch.add(
+            service.files().list(
+                q=query, fields=f"nextPageToken, {fields}", pageSize=1000
+            ),
+            request_id=key,
+        )
+    batch.execute(http=_thread_http(service))
+
+    for key, page_token in next_pages.items():
+        found[key].extend(_list_files(service, queries[key], fields, page_token))
+    for key, exc in errors.items():
+        print(f"[Drive] Batched lookup failed for {key}: {exc}")
+    return found
+
+def prefetch_region_files(service, regions, root_folder_id):
+    """
+    Resolve every region folder and its file ids with two batched calls.
+
+    Returns {region: {name: id}} and warms the folder/file id caches;
+    regions whose folder doesn't exist (or whose lookup failed) are
+    omitted so callers fall back to the per-call lookups.
+    """
+    folders = _batch_list(service, {
+        region: (
+            f"name='{region}' and '{root_folder_id}' in parents "
+            f"and mimeType='application/vnd.google-apps.folder' "
+            f"and trashed=false"
+        )
+        for region in regions
+    })
+    folder_ids = {region: files[0]["id"] for region, files in folders.items() if files}
+    if not folder_ids:
+        return {}
+
+    children = _batch_list(service, {
+        region: f"'{folder_id}' in parents and trashed=false"
+        for region, folder_id in folder_ids.items()
+    }, fields=_CHILD_FIELDS)
+
+    with _ID_CACHE_LOCK:
+        for region, folder_id in folder_ids.items():
+            _FOLDER_CACHE[(region, root_folder_id)] = folder_id
+    return {
+        region: _remember_children(files, folder_ids[region])
+        for region, files in children.items()
+    }
+
+def _resolve_file_id(service, filename, region_folder_id, file_ids):
+    """Look the file up in a precomputed name → id map, else query Drive."""
+    if file_ids is not None:
+        return file_ids.get(filename)
+    return find_file_id(service, filename, region_folder_id)
+
+def _download_file(service, region, filename, root_folder_id, file_ids, read):
+    """Download a file from region subfolder and parse it with read(buffer, label)."""
+    def attempt(ids):
+        region_folder_id = find_or_create_folder(service, region, root_folder_id)
+        file_id = _resolve_file_id(service, filename, region_folder_id, ids)
+
+        if not file_id:
+            print(f"[Drive] {region}/{filename} not found, returning empty DataFrame")
+            return pd.DataFrame()
+
+        return read(_download_media(service, file_id), f"{region}/{filename}")
+
+    return _retry_if_stale(attempt, file_ids, region, filename, root_folder_id)
+
+def download_jsonl(service, region, filename, root_folder_id, file_ids=None):
     """Download JSONL from region subfolder."""
-    region_folder_id = find_or_create_folder(service, region, root_folder_id)
-    file_id = find_file_id(service, filename, region_folder_id)
-    
-    if not file_id:
-        print(f"[Drive] {region}/{filename} not found, returning empty DataFrame")
-        return pd.DataFrame()
-    
-    buffer = io.BytesIO()
-    request = service.files().get_media(fileId=file_id)
-    downloader = MediaIoBaseDownload(buffer, request)
-    
-    done = False
-    while not done:
-        _, done = downloader.next_chunk()
-    
-    buffer.seek(0)
+    return _download_file(service, region, filename, root_folder_id, file_ids, _read_jsonl)
+
+def _json_default(obj):
+    """orjson fallback for pandas scalars it doesn't know."""
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def encode_jsonl(df):
+    """DataFrame → JSONL bytes; orjson per record when available, else pandas."""
+    if not ORJSON_AVAILABLE:
+        return df.to_json(orient="records", lines=True, date_format="iso").encode("utf-8")
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+    lines = [
+        orjson.dumps(record, default=_json_default, option=option)
+        for record in df.to_dict(orient="records")
+    ]
+    return b"\n".join(lines) + b"\n" if lines else b""
+
+def _read_jsonl(buffer, label):
+    """Parse a downloaded JSONL buffer, empty DataFrame on failure."""
     try:
-        df = pd.read_json(buffer, lines=True)
-        print(f"[Drive] Downloaded {region}/{filename}: {len(df)} rows")
+        with buffer:
+            df = pd.read_json(buffer, lines=True)
+        print(f"[Drive] Downloaded {label}: {len(df)} rows")
         return df
     except Exception as e:
-        print(f"[Drive] Error reading {region}/{filename}: {e}")
+        print(f"[Drive] Error reading {label}: {e}")
         return pd.DataFrame()
 
-def upload_jsonl(service, df, region, filename, root_folder_id):
+def _upload_bytes(service, content, region, filename, root_folder_id, file_ids, rows):
+    """Create or overwrite a file in the region subfolder."""
+    def attempt(ids):
+        region_folder_id = find_or_create_folder(service, region, root_folder_id)
+
+        file_id = _resolve_file_id(service, filename, region_folder_id, ids)
+        media = MediaIoBaseUpload(
+            io.BytesIO(content),
+            mimetype="application/octet-stream",
+            resumable=False
+        )
+
+        if file_id:
+            service.files().update(
+                fileId=file_id,
+                media_body=media
+            ).execute(http=_thread_http(service), num_retries=WRITE_RETRIES)
+            print(f"[Drive] Updated {region}/{filename}: {rows} rows")
+        else:
+            metadata = {
+                "name": filename,
+                "parents": [region_folder_id]
+            }
+            created = service.files().create(
+                body=metadata,
+                media_body=media,
+                fields="id"
+            ).execute(http=_thread_http(service), num_retries=WRITE_RETRIES)
+            _remember_file(filename, region_folder_id, created["id"])
+            print(f"[Drive] Created {region}/{filename}: {rows} rows")
+
+    _retry_if_stale(attempt, file_ids, region, filename, root_folder_id)
+
+def upload_jsonl(service, df, region, filename, root_folder_id, file_ids=None):
     """Upload DataFrame as JSONL to region subfolder."""
     if df is None:
         df = pd.DataFrame()
-    
-    region_folder_id = find_or_create_folder(service, region, root_folder_id)
-    
-    content = df.to_json(orient="records", lines=True, date_format="iso")
-    buffer = io.BytesIO(content.encode("utf-8"))
-    
-    file_id = find_file_id(service, filename, region_folder_id)
-    media = MediaIoBaseUpload(
-        buffer,
-        mimetype="application/octet-stream",
-        resumable=False
-    )
-    
-    if file_id:
-        service.files().update(
-            fileId=file_id,
-            media_body=media
-        ).execute()
-        print(f"[Drive] Updated {region}/{filename}: {len(df)} rows")
-    else:
-        metadata = {
-            "name": filename,
-            "parents": [region_folder_id]
-        }
-        service.files().create(
-            body=metadata,
-            media_body=media,
-            fields="id"
-        ).execute()
-        print(f"[Drive] Created {region}/{filename}: {len(df)} rows")
-
-def download_checkpoint(service, region, root_folder_id):
-    """Download checkpoint for a region."""
-    region_folder_id = find_or_create_folder(service, region, root_folder_id)
-    file_id = find_file_id(service, "checkpoint.json", region_folder_id)
-    
-    if not file_id:
-        return None
-    
+    _upload_bytes(service, encode_jsonl(df), region, filename, root_folder_id, file_ids, len(df))
+
+def upload_parquet(service, df, region, filename, root_folder_id, file_ids=None):
+    """Upload DataFrame as zstd parquet to region subfolder."""
+    if df is None:
+        df = pd.DataFrame()
     buffer = io.BytesIO()
-    request = service.files().get_media(fileId=file_id)
-    downloader = MediaIoBaseDownload(buffer, request)
-    done = False
-    while not done:
-        _, done = downloader.next_chunk()
-    
-    buffer.seek(0)
+    df.to_parquet(buffer, engine="pyarrow", compression="zstd")
+    _upload_bytes(service, buffer.getvalue(), region, filename, root_folder_id, file_ids, len(df))
+
+def restore_list_columns(df):
+    """Parquet hands list cells (tags, usfs) back as ndarrays; make them lists again."""
+    cols = {
+        c: df[c].map(lambda v: v.tolist() if isinstance(v, np.ndarray) else v)
+        for c in df.select_dtypes("object").columns
+        if df[c].map(lambda v: isinstance(v, np.ndarray)).any()
+    }
+    return df.assign(**cols) if cols else df
+
+def download_parquet(service, region, filename, root_folder_id, file_ids=None):
+    """Download parquet from region subfolder."""
+    return _download_file(service, region, filename, root_folder_id, file_ids, _read_parquet)
+
+def _read_parquet(buffer, label):
+    """Parse a downloaded parquet buffer, empty DataFrame on failure."""
     try:
-        return json.loads(buffer.read()).get("last_fetched_ms")
-    except Exception:
-        return None
+        with buffer:
+            df = restore_list_columns(pd.read_parquet(buffer, engine="pyarrow"))
+        print(f"[Drive] Downloaded {label}: {len(df)} rows")
+        return df
+    except Exception as e:
+        print(f"[Drive] Error reading {label}: {e}")
+        return pd.DataFrame()
+
+# ── Cache format: parquet, with JSONL read/write fallback ──
+
+def pick_cache_file(stem, names, modified=None):
+    """
+    Choose between {stem}.parquet and {stem}.jsonl among existing names.
+
+    When both exist the newer one by Drive modifiedTime wins (parquet if
+    the times are unknown); returns None when neither exists.
+    """
+    parquet, jsonl = f"{stem}.parquet", f"{stem}.jsonl"
+    if parquet not in names:
+        return jsonl if jsonl in names else None
+    if jsonl not in names or modified is None:
+        return parquet
+    p_time, j_time = modified(parquet), modified(jsonl)
+    if p_time and j_time and j_time > p_time:
+        return jsonl
+    return parquet
+
+def download_frame(service, region, stem, root_folder_id, file_ids=None):
+    """Download a cached frame by stem from whichever format is current."""
+    if file_ids is None:
+        file_ids = list_region_files(
+            service, find_or_create_folder(service, region, root_folder_id)
+        )
+    filename = pick_cache_file(
+        stem, file_ids, lambda name: get_modified_time(file_ids[name])
+    ) or f"{stem}.parquet"
+    if filename.endswith(".jsonl"):
+        return download_jsonl(service, region, filename, root_folder_id, file_ids)
+    return download_parquet(service, region, filename, root_folder_id, file_ids)
+
+def upload_frame(service, df, region, stem, root_folder_id, file_ids=None):
+    """Upload a cached frame as parquet, falling back to JSONL if Arrow can't encode it."""
+    try:
+        upload_parquet(service, df, region, f"{stem}.parquet", root_folder_id, file_ids)
+    except (ValueError, TypeError, NotImplementedError) as e:
+        # Mixed-type object columns Arrow can't encode
+        print(f"[Drive] Parquet upload failed for {region}/{stem}, using JSONL: {e}")
+        upload_jsonl(service, df, region, f"{stem}.jsonl", root_folder_id, file_ids)
+
+def download_checkpoint(service, region, root_folder_id, file_ids=None):
+    """Download checkpoint for a region."""
+    def attempt(ids):
+        region_folder_id = find_or_create_folder(service, region, root_folder_id)
+        file_id = _resolve_file_id(service, "checkpoint.json", region_folder_id, ids)
+
+        if not file_id:
+            return None
+
+        with _download_media(service, file_id) as buffer:
+            try:
+                return json.loads(buffer.read()).get("last_fetched_ms")
+            except Exception:
+                return None
+
+    return _retry_if_stale(attempt, file_ids, region, "checkpoint.json", root_folder_id)
 
 def upload_checkpoint(service, region, ts, root_folder_id):
     """Upload checkpoint for a region."""
-    region_folder_id = find_or_create_folder(service, region, root_folder_id)
-    
     content = json.dumps({"last_fetched_ms": ts}).encode("utf-8")
-    buffer = io.BytesIO(content)
-    
-    file_id = find_file_id(service, "checkpoint.json", region_folder_id)
-    media = MediaIoBaseUpload(buffer, mimetype="application/json")
-    
-    if file_id:
-        service.files().update(fileId=file_id, media_body=media).execute()
-    else:
-        service.files().create(
-            body={"name": "checkpoint.json", "parents": [region_folder_id]},
-            media_body=media,
-            fields="id"
-        ).execute()
-    print(f"[Drive] Checkpoint saved for {region}: {ts}")
\ No newline at end of file
+
+    def attempt(ids):
+        region_folder_id = find_or_create_folder(service, region, root_folder_id)
+
+        file_id = find_file_id(service, "checkpoint.json", region_folder_id)
+        media = MediaIoBaseUpload(io.BytesIO(content), mimetype="application/json")
+
+        if file_id:
+            service.files().update(fileId=file_id, media_body=media).execute(http=_thread_http(service))
+        else:
+            created = service.files().create(
+                body={"name": "checkpoint.json", "parents": [region_folder_id]},
+                media_body=media,
+                fields="id"
+            ).execute(http=_thread_http(service))
+            _remember_file("checkpoint.json", region_folder_id, created["id"])
+
+    _retry_if_stale(attempt, None, region, "checkpoint.json", root_folder_id)
+    print(f"[Drive] Checkpoint saved for {region}: {ts}")
+
+def _list_files(service, query, fields="files(id, name, parents)", page_token=None):
+    """files().list with pagination, optionally resuming from a page token."""
+    files = []
+    while True:
+        results = service.files().list(
+            q=query, fields=f"nextPageToken, {fields}",
+            pageSize=1000, pageToken=page_token
+        ).execute(http=_thread_http(service))
+        files.extend(results.get("files", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return files
+
+def _build_region_results(region, raw, start_ms, end_ms):
+    """Filter raw cached frames to the window and build the dashboard dict."""
+    from data_fetcher import (
+        add_usfs_column,
+        usfs_mask,
+        prepare_data_loss_table,
+        build_data_loss_summary,
+        build_daily_df,
+        build_daily_alert_count_df,
+        build_daily_pv_df,
+        build_daily_amount_df,
+    )
+
+    def filter_range(df):
+        if df is not None and not df.empty and "time_ms" in df.columns:
+            tm = df["time_ms"].to_numpy()
+            if df["time_ms"].is_monotonic_increasing:
+                # Sorted: two binary searches, no boolean mask
+                lo = tm.searchsorted(start_ms, side="left")
+                hi = tm.searchsorted(end_ms, side="right")
+                return df.iloc[lo:hi].copy()
+            return df[(tm >= start_ms) & (tm <= end_ms)].copy()
+        return df if df is not None else pd.DataFrame()
+
+    data = {key: filter_range(df) for key, df in raw.items()}
+    theft_all, fill_all = data["theft_raw"], data["fill_raw"]
+
+    if not theft_all.empty:
+        theft_all = add_usfs_column(theft_all)
+    if not fill_all.empty:
+        fill_all = add_usfs_column(fill_all)
+
+    def pv(df):
+        if df.empty or "probable_variation_max" not in df.columns:
+            return pd.DataFrame()
+        return df.dropna(subset=["probable_variation_max"])
+
+    def usfs(df):
+        if df.empty or "usfs" not in df.columns:
+            return pd.DataFrame()
+        return df[usfs_mask(df["usfs"])]
+
+    return {
+        "theft_raw":         theft_all,
+        "fill_raw":          fill_all,
+        "low_fuel_raw":      data["low_fuel_raw"],
+        "data_loss_raw":     data["data_loss_raw"],
+        "theft_cev":         data["theft_cev"],
+        "fill_cev":          data["fill_cev"],
+        "data_loss_table":   prepare_data_loss_table(data["data_loss_raw"], region),
+        "data_loss_summary": build_data_loss_summary(data["data_loss_raw"]),
+        "theft_daily":       build_daily_df(theft_all),
+        "fill_daily":        build_daily_df(fill_all),
+        "low_fuel_daily":    build_daily_alert_count_df(data["low_fuel_raw"]),
+        "theft_cev_daily":   build_daily_df(data["theft_cev"]),
+        "fill_cev_daily":    build_daily_df(data["fill_cev"]),
+        "theft_pv_daily":    build_daily_pv_df(pv(theft_all)),
+        "fill_pv_daily":     build_daily_pv_df(pv(fill_all)),
+        "theft_usfs_daily":  build_daily_amount_df(usfs(theft_all)),
+        "fill_usfs_daily":   build_daily_amount_df(usfs(fill_all)),
+    }
+
+def list_cached_files(service, regions, root_folder_id):
+    """
+    {region: {filename: id}} for several region folders in two queries.
+
+    One query resolves every region folder and one OR-joined query lists
+    the files in all of them, recording modifiedTime and size for
+    pick_cache_file and _download_media. Regions without a Drive folder
+    are left out so callers can fall back to the live API for them.
+    """
+    names = " or ".join(f"name='{region}'" for region in regions)
+    folders = _list_files(
+        service,
+        f"'{root_folder_id}' in parents and ({names}) "
+        f"and mimeType='application/vnd.google-apps.folder' "
+        f"and trashed=false",
+        fields="files(id, name)",
+    )
+    folder_regions = {f["id"]: f["name"] for f in folders}
+    if not folder_regions:
+        return {}
+    with _ID_CACHE_LOCK:
+        for folder_id, region in folder_regions.items():
+            _FOLDER_CACHE[(region, root_folder_id)] = folder_id
+
+    parents = " or ".join(f"'{folder_id}' in parents" for folder_id in folder_regions)
+    region_files = {region: {} for region in folder_regions.values()}
+    for f in _list_files(
+        service, f"({parents}) and trashed=false",
+        fields="files(id, name, parents, modifiedTime, size)",
+    ):
+        for parent in f.get("parents", []):
+            if parent in folder_regions:
+                region_files[folder_regions[parent]].setdefault(f["name"], f["id"])
+        with _ID_CACHE_LOCK:
+            if "modifiedTime" in f:
+                _FILE_META[f["id"]] = f["modifiedTime"]
+            if "size" in f:
+                _FILE_SIZE[f["id"]] = int(f["size"])
+    return region_files
+
+def load_cached_data(service, region, root_folder_id, start_ms, end_ms, file_ids=None):
+    """
+    Load one region's Drive cache, downloading its blobs (parquet, or JSONL
+    for older caches) concurrently. Pass file_ids from list_cached_files to
+    skip the listing.
+    """
+    if file_ids is None:
+        file_ids = list_cached_files(service, [region], root_folder_id).get(region)
+        if file_ids is None:
+            raise FileNotFoundError(f"No Drive cache folder for {region}")
+
+    def fetch(filename):
+        read = _read_jsonl if filename.endswith(".jsonl") else _read_parquet
+        return _download_file(service, region, filename, root_folder_id, file_ids, read)
+
+    raw = {key: pd.DataFrame() for key in CACHE_FILES}
+    with ThreadPoolExecutor(max_workers=len(CACHE_FILES)) as ex:
+        futures = {}
+        for key, stem in CACHE_FILES.items():
+            filename = pick_cache_file(
+                stem, file_ids, lambda name: get_modified_time(file_ids[name])
+            )
+            if filename:
+                futures[ex.submit(fetch, filename)] = key
+            else:
+                print(f"[Drive] {region}/{stem} not found, returning empty DataFrame")
+        for fut in as_completed(futures):
+            raw[futures[fut]] = fut.result()
+
+    return _build_region_results(region, raw, start_ms, end_ms)
@@ -12,12 +12,12 @@ Run once from your project root:
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import tomli as tomllib
 import pandas as pd
 from pathlib import Path
 from typing import Optional
-from googleapiclient.discovery import build
 from google.oauth2 import service_account
 
 # ── Setup ────────────────────────────────────────────────────
@@ -38,6 +38,9 @@ FILES = [
 
 SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+# Concurrent Drive uploads (Drive allows roughly 10 writes/s per user)
+UPLOAD_WORKERS = 8
+
 
 def read_local_jsonl(path: Path) -> pd.DataFrame:
     if not path.exists():
@@ -67,14 +70,17 @@ def ensure_time_ms(df: pd.DataFrame) -> pd.DataFrame:
         return df
     if "time" not in df.columns:
         return df
-    try:
-        if pd.api.types.is_numeric_dtype(df["time"]):
-            df["time_ms"] = df["time"]
-        else:
-            df["time"] = pd.to_datetime(df["time"], errors="coerce")
-            df["time_ms"] = df["time"].astype("int64") // 10**6
-    except Exception as e:
-        print(f"  [WARN] Could not compute time_ms: {e}")
+    if pd.api.types.is_numeric_dtype(df["time"]):
+        df["time_ms"] = df["time"]
+        return df
+
+    if not pd.api.types.is_datetime64_any_dtype(df["time"]):
+        df["time"] = pd.to_datetime(df["time"], errors="coerce")
+    # datetime64 → datetime64[ms] → int64 view: epoch ms with no divide pass
+    ms = df["time"].to_numpy(dtype="datetime64[ms]").view("int64")
+    df["time_ms"] = ms
+    if df["time"].isna().any():
+        df["time_ms"] = df["time_ms"].astype("Int64").mask(df["time"].isna())
     return df
 
 
@@ -91,56 +97,96 @@ if __name__ == "__main__":
         secrets = tomllib.load(f)
 
     # ── Connect to Drive ──────────────────────────────────────
-    from drive_cache import upload_jsonl, upload_checkpoint, download_checkpoint
+    from drive_cache import (
+        upload_jsonl, upload_parquet, upload_checkpoint, download_checkpoint,
+        find_or_create_folder, build_drive_service,
+    )
 
     creds = service_account.Credentials.from_service_account_info(
         secrets["google_service_account"], scopes=SCOPES
     )
-    service = build("drive", "v3", credentials=creds)
+    service = build_drive_service(creds)
     root_folder_id = secrets["DRIVE_FOLDER_ID"]
     print(f"Connected to Drive. Root folder: {root_folder_id}\n")
 
+    def upload_one(upload, df, region, filename):
+        """Upload one file → True on success; errors are reported, not raised."""
+        try:
+            upload(service, df, region, filename, root_folder_id)
+            print(f"  [OK] {region}/{filename} uploaded")
+            return True
+        except Exception as e:
+            print(f"  [ERROR] {region}/{filename}: {e}")
+            return False
+
     # ── Process each region ───────────────────────────────────
-    for region in REGIONS:
-        region_dir = CACHE_DIR / region
-        print(f"\n{'='*40}")
-        print(f"Region: {region}")
-        print(f"{'='*40}")
+    # Uploads run UPLOAD_WORKERS at a time; drive_cache gives each worker
+    # thread its own Http and retries 429/5xx with exponential backoff
+    failed = {}
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        for region in REGIONS:
+            region_dir = CACHE_DIR / region
+            print(f"\n{'='*40}")
+            print(f"Region: {region}")
+            print(f"{'='*40}")
+
+            if not region_dir.exists():
+                print(f"  [SKIP] No local cache dir found")
+                continue
+
+            # Resolve (or create) the region folder once, before workers race on it
+            find_or_create_folder(service, region, root_folder_id)
+
+            latest_ms = None
+            futures = {}
+
+            for filename in FILES:
+                df = read_local_jsonl(region_dir / filename)
+                if df.empty:
+                    continue
+
+                df = ensure_time_ms(df)
 
-        if not region_dir.exists():
-            print(f"  [SKIP] No local cache dir found")
-            continue
+                ts = get_latest_timestamp_ms(df)
+                if ts and (latest_ms is None or ts > latest_ms):
+                    latest_ms = ts
 
-        latest_ms = None
+                print(f"  [UPLOAD] {filename} ({len(df)} rows) → Drive...")
+                futures[pool.submit(upload_one, upload_jsonl, df, region, filename)] = filename
 
-        for filename in FILES:
-            df = read_local_jsonl(region_dir / filename)
-            if df.empty:
+                # Parquet copy alongside the JSONL while readers move over
+                parquet_name = Path(filename).with_suffix(".parquet").name
+                futures[pool.submit(upload_one, upload_parquet, df, region, parquet_name)] = parquet_name
+
+            region_failed = sorted(
+                futures[fut] for fut in as_completed(futures) if not fut.result()
+            )
+            if region_failed:
+                failed[region] = region_failed
+                # Advancing the checkpoint would make the next run skip data Drive doesn't have
+                print(f"  [WARN] {len(region_failed)} upload(s) failed, checkpoint not updated")
                 continue
 
-            df = ensure_time_ms(df)
-
-            ts = get_latest_timestamp_ms(df)
-            if ts and (latest_ms is None or ts > latest_ms):
-                latest_ms = ts
-
-            print(f"  [UPLOAD] {filename} ({len(df)} rows) → Drive...")
-            try:
-                upload_jsonl(service, df, region, filename, root_folder_id)
-                print(f"  [OK] {filename} uploaded")
-            except Exception as e:
-                print(f"  [ERROR] {filename}: {e}")
-
-        # Set checkpoint to latest timestamp so only missing days are fetched next
-        if latest_ms:
-            existing = download_checkpoint(service, region, root_folder_id)
-            print(f"\n  Existing checkpoint : {existing}")
-            print(f"  New checkpoint      : {latest_ms}")
-            print(f"  Date                : {pd.to_datetime(latest_ms, unit='ms')}")
-            upload_checkpoint(service, region, latest_ms, root_folder_id)
-            print(f"  [OK] Checkpoint updated for {region}")
-        else:
-            print(f"  [WARN] No timestamps found, checkpoint not updated")
+            # Set checkpoint to latest timestamp so only missing days are fetched next
+            if latest_ms:
+                existing = download_checkpoint(service, region, root_folder_id)
+                print(f"\n  Existing checkpoint : {existing}")
+                print(f"  New checkpoint      : {latest_ms}")
+                print(f"  Date                : {pd.to_datetime(latest_ms, unit='ms')}")
+                upload_checkpoint(service, region, latest_ms, root_folder_id)
+                print(f"  [OK] Checkpoint updated for {region}")
+            else:
+                print(f"  [WARN] No timestamps found, checkpoint not updated")
+
+    if failed:
+        print(f"\n{'='*40}")
+        print("Migration finished with failed uploads:")
+        for region, filenames in failed.items():
+            print(f"  {region}: {', '.join(filenames)}")
+        print("Re-run the script to retry; their checkpoints were left as they were.")
+        print(f"{'='*40}")
+        sys.exit(1)
 
     print(f"\n{'='*40}")
     print("Migration complete!")